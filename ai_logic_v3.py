@@ -1,104 +1,386 @@
-import PyPDF2
-import re
-import os
+import math
+import time
 from collections import Counter
+import metrics
+from text_matcher import get_matcher
+from doc_guard import ResourceLimitExceeded
+from scoring_plan import get_plan
+from tokenizer import bigram_key, count_stem_bigrams, stem_counts, stem_phrase, tokenize
+from pdf_cache import (
+    get_document_text, iter_page_texts, store_document_text,
+    file_sha256, file_digest, cache_get, cache_put,
+)
 
+# Naikkan versi ini jika isi/format 'features' berubah
+# (v2: tambah 'stem_counts'; v3: tambah 'stem_bigrams'; v4: stemmer memilih
+# kata dasar yang dikenal; features lama di cache diekstrak ulang)
+FEATURES_VERSION = 4
+
+# Istilah indikator 'insight' (Kualitas Analisis)
+INSIGHT_KEYWORDS = ['rekomendasi', 'solusi', 'usulan', 'penyebab', 'evaluasi', 'tindak lanjut']
+# Bentuk dasarnya dihitung sekali, agar 'merekomendasikan' ikut terhitung.
+# Hanya istilah yang sudah berupa kata dasar: 'penyebab' -> 'sebab' (kata
+# sambung umum) dan 'usulan' tetap dicocokkan persis.
+INSIGHT_STEMS = {term: stem_phrase(term) for term in INSIGHT_KEYWORDS
+                 if stem_phrase(term) == tuple(tokenize(term))}
+
+# Nama bagian laporan yang umum dipakai, selalu dicari saat ekstraksi
+# agar template baru bisa dinilai ulang tanpa membuka teks dokumen.
+DEFAULT_SECTION_TERMS = [
+    'pendahuluan', 'latar belakang', 'tujuan', 'ruang lingkup', 'metode', 'metodologi',
+    'analisis', 'pembahasan', 'hasil', 'kesimpulan', 'rekomendasi', 'saran',
+    'penutup', 'lampiran', 'ringkasan', 'daftar isi',
+]
+
+# Jenis data kuantitatif yang dihitung (lihat text_matcher.py)
+QUANT_KINDS = ('angka', 'persen', 'rupiah')
+
+
+def _find_offsets(text, terms):
+    """Posisi kemunculan pertama tiap istilah (literal) di teks; -1 jika tidak ada."""
+    hits = {term: -1 for term in terms}
+    get_matcher(tuple(terms)).scan(text, hits, {kind: 0 for kind in QUANT_KINDS})
+    return hits
+
+
+def _scan_pages(pages, section_terms, stop_when=None, keep_text=True):
+    """
+    Membangun features secara inkremental per halaman: token langsung dihitung
+    ke Counter, sedangkan istilah bagian/insight dan pola kuantitatif dicari
+    dengan satu scan TermMatcher per halaman, tanpa menunggu seluruh teks
+    terkumpul. Jika 'stop_when(features)' bernilai True, pembacaan
+    halaman berikutnya dihentikan dan features ditandai 'partial'.
+
+    Return (features, chunks) dengan chunks = daftar teks halaman yang dibaca,
+    atau None jika 'keep_text' False (teks tidak akan disimpan, jadi setiap
+    halaman langsung dilepas setelah diproses).
+    """
+    matcher = get_matcher(tuple(dict.fromkeys(list(section_terms) + INSIGHT_KEYWORDS)))
+    hits = {term: -1 for term in matcher.terms}
+    features = {
+        'word_count': 0,
+        'token_counts': Counter(),
+        'section_hits': {term: -1 for term in section_terms},
+        'insight_hits': {term: -1 for term in INSIGHT_KEYWORDS},
+        'quant': {kind: 0 for kind in QUANT_KINDS},
+        'stem_counts': Counter(),
+        'stem_bigrams': Counter(),
+        'partial': False,
+    }
+    # Sisa akhir halaman sebelumnya, agar istilah multi-kata lintas halaman tetap cocok
+    overlap = max(len(term) for term in matcher.terms) - 1
+    tail = ""
+    offset = 0
+    chunks = [] if keep_text else None
+    # Waktu tokenisasi & pencocokan diakumulasi lalu dicatat sekali per dokumen
+    t_token = t_match = 0.0
+    token_stems = {}
+    last_stem = None
+
+    for chunk in pages:
+        if keep_text:
+            chunks.append(chunk)
+        start = time.perf_counter()
+        words = chunk.split()
+        features['token_counts'].update(words)
+        features['word_count'] += len(words)
+        last_stem = count_stem_bigrams(words, features['stem_bigrams'], token_stems, last_stem)
+        t_token += time.perf_counter() - start
+
+        start = time.perf_counter()
+        window = tail + chunk
+        # Temuan kuantitatif yang sudah selesai di 'tail' tidak dihitung dua kali
+        matcher.scan(window, hits, features['quant'], base=offset - len(tail), quant_from=len(tail))
+        t_match += time.perf_counter() - start
+        features['section_hits'] = {term: hits[term] for term in section_terms}
+        features['insight_hits'] = {term: hits[term] for term in INSIGHT_KEYWORDS}
+
+        offset += len(chunk)
+        tail = window[-overlap:] if overlap > 0 else ""
+
+        if stop_when is not None and stop_when(features):
+            features['partial'] = True
+            metrics.incr("v3_early_exit")
+            break
+
+    # Stem dihitung dari token unik (bukan per kemunculan), sekali per dokumen
+    start = time.perf_counter()
+    features['stem_counts'] = stem_counts(features['token_counts'])
+    t_token += time.perf_counter() - start
+
+    metrics.observe("v3_tokenisasi", t_token)
+    metrics.observe("v3_pencocokan_istilah", t_match)
+    return features, chunks
+
+
+def _saturation_check(plan):
+    """
+    Kondisi di mana membaca halaman tambahan tidak bisa lagi mengubah skor
+    template ini: semua kata kunci mencapai batas frekuensinya, semua bagian
+    ditemukan, insight >= 3, data kuantitatif ada (jika analitis) dan
+    dokumen > 1000 kata.
+    """
+    keywords, sections, is_analitis = plan.keywords, plan.sections, plan.is_analitis
+    caps = plan.keyword_caps
+
+    def saturated(features):
+        return (
+            features['word_count'] > 1000
+            and all(features['token_counts'][k] >= cap for k, cap in zip(keywords, caps))
+            and all(features['section_hits'][s] >= 0 for s in sections)
+            and sum(1 for pos in features['insight_hits'].values() if pos >= 0) >= 3
+            and (not is_analitis or features['quant']['angka'] > 0)
+        )
+    return saturated
+
+
+@metrics.timed("v3_extract_features")
+def extract_features(file_path, section_terms=(), early_exit_for=None):
+    """
+    Tahap 1: Ekstraksi 'document features' (sekali per dokumen).
+
+    Hasilnya dict kecil yang bisa di-serialize ke JSON dan tidak bergantung
+    pada template, sehingga bisa dinilai ulang dengan template apa pun lewat
+    score(). 'section_terms' opsional: bagian tambahan (di luar
+    DEFAULT_SECTION_TERMS) yang perlu dicatat posisinya.
+
+    Jika 'early_exit_for' diisi template (atau ScoringPlan), pembacaan PDF berhenti begitu skor
+    template tersebut sudah maksimal. Features hasilnya 'partial' dan tidak
+    disimpan ke cache (hanya valid untuk template itu).
+    """
+    digest = file_sha256(file_path)
+    section_terms = [s.strip().lower() for s in section_terms if s and s.strip()]
+
+    features = cache_get(digest, "features")
+    if features is not None and features.get('version') == FEATURES_VERSION:
+        missing = [s for s in section_terms if s not in features['section_hits']]
+        if missing:
+            text = get_document_text(file_path, digest)['text']
+            features['section_hits'].update(_find_offsets(text, missing))
+            cache_put(digest, "features", features)
+        metrics.incr("v3_features_cache_hit")
+        return features
+
+    # Teks yang sudah pernah di-parse (mis. oleh analyzer lama) dipakai ulang
+    cached_text = cache_get(digest, "text")
+    pages = [cached_text['text']] if cached_text is not None else iter_page_texts(file_path)
+    terms = list(dict.fromkeys(DEFAULT_SECTION_TERMS + section_terms))
+    # Early-exit hanya menghemat parsing PDF; teks dari cache langsung dibaca
+    # penuh, jadi features-nya lengkap dan ikut disimpan
+    stop_when = None
+    if early_exit_for is not None and cached_text is None:
+        stop_when = _saturation_check(get_plan(early_exit_for))
+    # Teks halaman hanya ditahan jika akan disimpan ke cache teks: tidak
+    # perlu jika teks sudah ada, dan tidak dilakukan pada mode early-exit
+    # (hasilnya biasanya parsial dan tidak disimpan)
+    keep_text = cached_text is None and early_exit_for is None
+
+    features, chunks = _scan_pages(pages, terms, stop_when, keep_text)
+    features['version'] = FEATURES_VERSION
+    features['sha256'] = digest
+    if features['partial']:
+        return features
+
+    if keep_text:
+        text = "".join(chunks)
+        chunks.clear()
+        store_document_text(digest, text, features['token_counts'])
+    cache_put(digest, "features", features)
+    return features
+
+
+def load_cached_features(file_path):
+    """
+    Features lengkap dari cache saja (PDF tidak pernah dibuka), atau None.
+    File upload baru bernama SHA-256 isinya, jadi file tidak perlu di-hash ulang.
+    """
+    digest = file_digest(file_path)
+    if digest is None:
+        return None
+    features = cache_get(digest, "features")
+    if features is None or features.get('version') != FEATURES_VERSION:
+        return None
+    return features
+
+
+def _section_found(features, section, plan):
+    offset = features['section_hits'].get(section)
+    if offset is not None:
+        return offset >= 0
+    # Bagian satu kata yang tidak dicatat saat ekstraksi: cukup dicek di token
+    if section not in plan.single_word_sections:
+        return False
+    return any(section in token for token in features['token_counts'])
+
+
+def _stem_frequency(features, term_stems):
+    """
+    Frekuensi istilah lewat bentuk dasarnya; O(1) per kata. Istilah
+    multi-kata harus muncul berdampingan: setiap pasangan stem berurutannya
+    ada di 'stem_bigrams' (frekuensi = pasangan paling jarang).
+    """
+    if not term_stems:
+        return 0
+    if len(term_stems) == 1:
+        return features.get('stem_counts', {}).get(term_stems[0], 0)
+    bigrams = features.get('stem_bigrams', {})
+    return min(bigrams.get(bigram_key(a, b), 0) for a, b in zip(term_stems, term_stems[1:]))
+
+
+def _term_frequency(features, term, term_stems):
+    """Frekuensi kata kunci: token persis atau bentuk dasarnya."""
+    return max(features['token_counts'].get(term, 0), _stem_frequency(features, term_stems))
+
+
+def _saturation(tf, batas):
+    """
+    Kontribusi 0..1 satu kata kunci: naik secara logaritmik (gaya TF) dan
+    penuh begitu frekuensinya mencapai 'batas', jadi pengulangan berlebihan
+    tidak menaikkan skor.
+    """
+    if tf <= 0:
+        return 0.0
+    if tf >= batas:
+        return 1.0
+    return (1 + math.log(tf)) / (1 + math.log(batas))
+
+
+def compute_raw_scores(features, template):
+    """
+    Menghitung 4 SKOR MENTAH (0-100) dari features + template (dict atau ScoringPlan).
+    Return dict berisi skor mentah dan detail untuk catatan.
+    """
+    plan = get_plan(template)
+
+    # 1. Relevansi Kata Kunci (token persis, atau bentuk dasarnya: 'menganalisis' ~ 'analisis')
+    # Satu lookup O(1) per kata kunci di Counter yang sudah dihitung saat ekstraksi
+    task_keywords = plan.keywords
+    frequencies = [_term_frequency(features, k, k_stems)
+                   for k, k_stems in zip(task_keywords, plan.keyword_stems)]
+    found_count = sum(1 for tf in frequencies if tf > 0)
+    relevansi = 0
+    if task_keywords and plan.keywords_weighted:
+        # Kata kunci berbobot: rata-rata berbobot kontribusi tiap kata kunci
+        bobot_total = sum(plan.keyword_weights)
+        relevansi = 100 * sum(bobot * _saturation(tf, batas) for tf, bobot, batas
+                              in zip(frequencies, plan.keyword_weights, plan.keyword_caps)) / bobot_total
+    elif task_keywords:
+        if found_count == len(task_keywords):
+            relevansi = 100 # Semua keyword ditemukan
+        elif found_count > 0:
+            relevansi = 50 # Sebagian ditemukan
+
+    # 2. Kelengkapan Struktur (bobot default 1 = proporsi bagian yang ditemukan)
+    task_sections = plan.sections
+    found = [_section_found(features, s, plan) for s in task_sections]
+    found_sections = [s for s, ok in zip(task_sections, found) if ok]
+    struktur = 0
+    if task_sections:
+        struktur = (sum(bobot for bobot, ok in zip(plan.section_weights, found) if ok)
+                    / sum(plan.section_weights)) * 100
+
+    # 3. Kualitas Analisis
+    insight_count = sum(1 for term, offset in features['insight_hits'].items()
+                        if offset >= 0 or _stem_frequency(features, INSIGHT_STEMS.get(term, ())) > 0)
+    analisis = 0
+    if insight_count >= 3:
+        analisis += 50
+    elif insight_count >= 1:
+        analisis += 25
+
+    is_analitis = plan.is_analitis
+    has_quant = any(features['quant'].values())
+    if is_analitis:
+        if has_quant:
+            analisis += 50 # Ditemukan data kuantitatif
+    else:
+        # Jika bukan analitis, 50% sisanya diambil dari insight lagi
+        analisis *= 2 # Skor insight di-double
+
+    # 4. Keluasan Dokumen
+    word_count = features['word_count']
+    keluasan = 0
+    if word_count > 1000:
+        keluasan = 100
+    elif word_count > 500:
+        keluasan = 75
+    elif word_count > 200:
+        keluasan = 50
+
+    return {
+        'relevansi': relevansi,
+        'struktur': struktur,
+        'analisis': analisis,
+        'keluasan': keluasan,
+        'found_keywords': found_count,
+        'total_keywords': len(task_keywords),
+        'found_sections': len(found_sections),
+        'total_sections': len(task_sections),
+        'is_analitis': is_analitis,
+        'has_quant': has_quant,
+        'word_count': word_count,
+    }
+
+
+@metrics.timed("v3_score")
+def score(features, template):
+    """
+    Tahap 2: Penilaian murni (tanpa I/O) dari features + template berbobot.
+    Return (final_skor, final_catatan), sama seperti analyze_submission_ai_v3.
+    """
+    plan = get_plan(template)
+    raw = compute_raw_scores(features, plan)
+
+    catatan = ["**Laporan Analisis AI (V3):**"]
+    catatan.append(f"1. Relevansi: {raw['relevansi']:.0f}/100 (Ditemukan {raw['found_keywords']}/{raw['total_keywords']} kata kunci)")
+    catatan.append(f"2. Struktur: {raw['struktur']:.0f}/100 (Ditemukan {raw['found_sections']}/{raw['total_sections']} bagian)")
+    if raw['is_analitis']:
+        if raw['has_quant']:
+            catatan.append("✔️ Kualitas: Data kuantitatif terdeteksi.")
+        else:
+            catatan.append("❌ Kualitas: Laporan analitis ini tidak mengandung data kuantitatif (angka/persen).")
+    catatan.append(f"3. Kualitas Analisis: {raw['analisis']}/100")
+    # Setelah early-exit hanya sebagian dokumen yang dihitung (selalu > 1000 kata)
+    jumlah_kata = "> 1000" if features.get('partial') else raw['word_count']
+    catatan.append(f"4. Keluasan: {raw['keluasan']}/100 ({jumlah_kata} kata)")
+
+    # --- Kalkulasi Skor Akhir (Level-Up 1: Weighted Average) ---
+    w_relevansi, w_struktur, w_analisis, w_keluasan = plan.weights
+    final_skor = (
+        (raw['relevansi'] * w_relevansi / 100) +
+        (raw['struktur'] * w_struktur / 100) +
+        (raw['analisis'] * w_analisis / 100) +
+        (raw['keluasan'] * w_keluasan / 100)
+    )
+
+    final_catatan = "\n".join(catatan)
+    return final_skor, final_catatan
+
+
+@metrics.timed("v3_analisis_total")
 def analyze_submission_ai_v3(file_path, template):
     """
     Fungsi 'AI' kustom V3 (Implementasi 3 Level-Up).
     Menganalisis file PDF berdasarkan template yang DIBOBOTKAN oleh atasan.
-    
+
     'template' adalah dict lengkap dari database, berisi:
-    - required_keywords, required_sections
+    - required_keywords, required_sections (boleh 'istilah:bobot:batas')
     - tipe_dokumen ('Analitis/Data', 'Deskriptif/Notulensi', dll.)
     - weight_relevansi, weight_struktur, weight_analisis, weight_keluasan
     """
     try:
-        # 1. Buka dan baca file PDF
-        text = ""
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text().lower() + " "
-
-        final_skor = 0
-        catatan = ["**Laporan Analisis AI (V3):**"]
-        words = text.split()
-        word_count = len(words)
-        word_freq = Counter(words)
-
-        # --- Menghitung 4 SKOR MENTAH (0-100) ---
-
-        # 1. SKOR MENTAH: Relevansi Kata Kunci
-        raw_score_relevansi = 0
-        keywords_str = template.get('required_keywords', '')
-        task_keywords = [k.strip().lower() for k in keywords_str.split(',') if k.strip()]
-        if task_keywords:
-            found_count = sum(1 for k in task_keywords if word_freq[k] > 0)
-            if found_count == len(task_keywords):
-                raw_score_relevansi = 100 # Semua keyword ditemukan
-            elif found_count > 0:
-                raw_score_relevansi = 50 # Sebagian ditemukan
-        
-        catatan.append(f"1. Relevansi: {raw_score_relevansi}/100 (Ditemukan {found_count}/{len(task_keywords)} kata kunci)")
-
-        # 2. SKOR MENTAH: Kelengkapan Struktur
-        raw_score_struktur = 0
-        sections_str = template.get('required_sections', '')
-        task_sections = [s.strip().lower() for s in sections_str.split(',') if s.strip()]
-        if task_sections:
-            found_sections = [s for s in task_sections if re.search(s, text)]
-            raw_score_struktur = (len(found_sections) / len(task_sections)) * 100
-        
-        catatan.append(f"2. Struktur: {raw_score_struktur:.0f}/100 (Ditemukan {len(found_sections)}/{len(task_sections)} bagian)")
-
-        # 3. SKOR MENTAH: Kualitas Analisis (Level-Up 2)
-        raw_score_analisis = 0
-        insight_keywords = ['rekomendasi', 'solusi', 'usulan', 'penyebab', 'evaluasi', 'tindak lanjut']
-        insight_count = sum(1 for word in insight_keywords if word in text)
-        
-        # Cek insight (50%)
-        if insight_count >= 3:
-            raw_score_analisis += 50
-        elif insight_count >= 1:
-            raw_score_analisis += 25
-        
-        # Cek Kuantitatif (50%) - HANYA jika tipe 'Analitis'
-        if template['tipe_dokumen'] == 'Analitis/Data':
-            # Mencari angka (cth: 123), persentase (cth: 50%), atau mata uang (cth: Rp)
-            if re.search(r'(\d+)|(\d+%)|(rp\s*\d+)', text):
-                raw_score_analisis += 50 # Ditemukan data kuantitatif
-                catatan.append("✔️ Kualitas: Data kuantitatif terdeteksi.")
-            else:
-                catatan.append("❌ Kualitas: Laporan analitis ini tidak mengandung data kuantitatif (angka/persen).")
-        else:
-            # Jika bukan analitis, 50% sisanya diambil dari insight lagi
-            raw_score_analisis *= 2 # Skor insight di-double
-            
-        catatan.append(f"3. Kualitas Analisis: {raw_score_analisis}/100")
-
-        # 4. SKOR MENTAH: Keluasan Dokumen
-        raw_score_keluasan = 0
-        if word_count > 1000:
-            raw_score_keluasan = 100
-        elif word_count > 500:
-            raw_score_keluasan = 75
-        elif word_count > 200:
-            raw_score_keluasan = 50
-        
-        catatan.append(f"4. Keluasan: {raw_score_keluasan}/100 ({word_count} kata)")
-
-        # --- Kalkulasi Skor Akhir (Level-Up 1: Weighted Average) ---
-        final_skor = (
-            (raw_score_relevansi * template['weight_relevansi'] / 100) +
-            (raw_score_struktur * template['weight_struktur'] / 100) +
-            (raw_score_analisis * template['weight_analisis'] / 100) +
-            (raw_score_keluasan * template['weight_keluasan'] / 100)
+        # Template di-parse sekali per versi (lihat scoring_plan.py)
+        plan = get_plan(template)
+        features = extract_features(
+            file_path,
+            plan.sections,
+            early_exit_for=plan,
         )
-        
-        final_catatan = "\n".join(catatan)
-        return final_skor, final_catatan
+        return score(features, plan)
 
+    except (ResourceLimitExceeded, MemoryError):
+        # Ditangani pemanggil (doc_guard.run_guarded) sebagai hasil terstruktur
+        raise
     except Exception as e:
         print(f"Error saat memproses PDF: {e}")
-        return 0, f"Error: Gagal memproses file PDF. {e}"
\ No newline at end of file
+        return 0, f"Error: Gagal memproses file PDF. {e}"
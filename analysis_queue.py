@@ -0,0 +1,155 @@
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import partial
+import metrics
+from ai_logic_v3 import analyze_submission_ai_v3
+from search_index import index_file
+from near_duplicate import check_submission
+from doc_guard import HAS_ALARM, TIMEOUT_SECONDS, init_worker, run_guarded, timeout_catatan
+
+# --- Konfigurasi Worker ---
+# PyPDF2 murni Python (CPU-bound, terkunci GIL), jadi analisis dijalankan
+# di proses terpisah agar throughput naik sesuai jumlah core.
+MAX_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", os.cpu_count() or 2))
+# Worker tidak di-fork langsung dari proses Streamlit (banyak thread, lock
+# dan koneksi DB yang bisa ikut tersalin dalam keadaan terkunci)
+_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+# Penanda di evaluasi_kinerja.catatan_ai selama analisis belum selesai
+PENDING_CATATAN = "⏳ Menunggu analisis AI..."
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            # Setiap worker dibatasi memorinya (lihat doc_guard.py)
+            _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=_MP_CONTEXT,
+                                            initializer=init_worker)
+        return _executor
+
+
+@contextmanager
+def _hide_script_main():
+    """
+    Streamlit memasang skrip dashboard sebagai modul __main__, dan worker
+    forkserver/spawn menjalankan ulang __main__ saat start. Selama worker
+    dibuat (di executor.submit), __main__ diganti modul kosong agar skrip
+    dashboard tidak ikut dijalankan di worker.
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+def _reset_executor(broken):
+    """Buang pool yang rusak (mis. worker dibunuh OS) agar submit berikutnya membuat pool baru."""
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _analyze(file_path, template, submission_id):
+    # Bandingkan dengan submission lain untuk template yang sama (MinHash/LSH).
+    # Cek ini butuh teks lengkap, jadi dijalankan lebih dulu: PDF di-parse
+    # sekali dan teksnya masuk cache untuk penilaian & indeks di bawah
+    catatan_mirip = check_submission(submission_id, template.get('id'), file_path)
+    skor, catatan = analyze_submission_ai_v3(file_path, template)
+    # Indeks pencarian butuh token seluruh dokumen (cache-or-parse), masih
+    # di dalam batas waktu & memori
+    index_file(submission_id, file_path)
+    return skor, catatan + catatan_mirip
+
+
+def _run_analysis(submission_id, file_path, template):
+    """Dijalankan di proses worker, dengan batas ukuran file, waktu & memori."""
+    skor, catatan = run_guarded(_analyze, file_path, template, submission_id)
+    # Metrik worker ikut dikirim agar bisa dilihat dari proses dashboard
+    return float(skor), catatan, metrics.drain()
+
+
+def _deliver(submission_id, on_result, skor, catatan):
+    """Kirim hasil SEKALI per submission (hasil yang datang setelah timeout diabaikan)."""
+    with _lock:
+        if submission_id not in _pending:
+            return
+        _pending.discard(submission_id)
+    try:
+        on_result(submission_id, skor, catatan)
+    except Exception as e:
+        print(f"Error menyimpan hasil analisis (submission {submission_id}): {e}")
+
+
+def _on_done(submission_id, on_result, executor, future):
+    """Callback di proses utama setelah worker selesai."""
+    try:
+        skor, catatan, worker_metrics = future.result()
+        metrics.merge(worker_metrics)
+        metrics.incr("analisis_selesai")
+    except BrokenProcessPool as e:
+        # Worker mati mendadak (biasanya kehabisan memori)
+        print(f"Worker analisis mati (submission {submission_id}): {e}")
+        _reset_executor(executor)
+        metrics.incr("analisis_worker_mati")
+        skor, catatan = 0.0, "Error: Worker analisis berhenti mendadak saat memproses dokumen ini."
+    except Exception as e:
+        print(f"Error worker analisis (submission {submission_id}): {e}")
+        metrics.incr("analisis_error")
+        skor, catatan = 0.0, f"Error: Gagal memproses file PDF. {e}"
+    _deliver(submission_id, on_result, skor, catatan)
+
+
+def _on_timeout(submission_id, on_result, future):
+    """Watchdog untuk OS tanpa SIGALRM (Windows): worker tidak bisa dihentikan, hasilnya diabaikan."""
+    if not future.done():
+        future.cancel()
+        metrics.incr("analisis_timeout_watchdog")
+        _deliver(submission_id, on_result, 0.0, timeout_catatan())
+
+
+def submit_analysis(submission_id, file_path, template, on_result):
+    """
+    Memasukkan dokumen ke antrian analisis (tidak blocking).
+
+    'on_result(submission_id, skor_ai, catatan_ai)' dipanggil di proses utama
+    setelah analisis selesai, untuk menulis hasil ke evaluasi_kinerja.
+    """
+    with _lock:
+        if submission_id in _pending:
+            return
+        _pending.add(submission_id)
+    executor = _get_executor()
+    with _hide_script_main():
+        future = executor.submit(_run_analysis, submission_id, file_path, dict(template))
+    future.add_done_callback(partial(_on_done, submission_id, on_result, executor))
+    if not HAS_ALARM and TIMEOUT_SECONDS:
+        # Waktu dihitung sejak masuk antrian, jadi beri kelonggaran untuk antrian
+        watchdog = threading.Timer(TIMEOUT_SECONDS * 2, _on_timeout, (submission_id, on_result, future))
+        watchdog.daemon = True
+        watchdog.start()
+
+
+def is_pending(submission_id):
+    with _lock:
+        return submission_id in _pending
+
+
+def pending_count():
+    with _lock:
+        return len(_pending)
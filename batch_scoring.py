@@ -0,0 +1,59 @@
+"""
+Penilaian batch (vektor) dengan NumPy di atas skor mentah dokumen.
+
+Skor akhir V3 hanyalah 4 skor mentah x bobot template / 100, jadi untuk
+banyak dokumen dan banyak kombinasi bobot cukup satu perkalian matriks:
+
+    skor[n_dokumen, n_template] = raw[n_dokumen, 4] @ bobot[n_template, 4].T / 100
+
+Dipakai untuk simulasi "what-if" bobot di dashboard atasan. Skor mentah
+dihitung dari features yang sudah ada di cache (PDF tidak dibuka lagi).
+"""
+import numpy as np
+from ai_logic_v3 import compute_raw_scores, load_cached_features
+from scoring_plan import get_plan
+
+RAW_COLUMNS = ('relevansi', 'struktur', 'analisis', 'keluasan')
+WEIGHT_COLUMNS = ('weight_relevansi', 'weight_struktur', 'weight_analisis', 'weight_keluasan')
+
+
+def raw_matrix(features_list, template):
+    """Matriks skor mentah (n_dokumen x 4) untuk satu template."""
+    plan = get_plan(template)
+    raw = np.zeros((len(features_list), len(RAW_COLUMNS)))
+    for i, features in enumerate(features_list):
+        scores = compute_raw_scores(features, plan)
+        raw[i] = [scores[col] for col in RAW_COLUMNS]
+    return raw
+
+
+def weight_matrix(templates):
+    """Matriks bobot (n_template x 4) dari dict template (atau dict berisi kolom bobot)."""
+    return np.array([[float(t[col]) for col in WEIGHT_COLUMNS] for t in templates], dtype=float).reshape(-1, 4)
+
+
+def score_batch(raw, weights):
+    """
+    Skor akhir semua dokumen untuk semua set bobot dalam satu operasi.
+    'raw' (n x 4), 'weights' (m x 4) atau satu baris bobot (4,).
+    Return (n x m), atau (n,) jika 'weights' satu baris.
+    """
+    raw = np.asarray(raw, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    return raw @ weights.T / 100
+
+
+def cohort_raw_scores(file_paths, template):
+    """
+    Skor mentah untuk sekumpulan file dari features di cache.
+    Return (raw (k x 4), index file yang punya features); file tanpa
+    features di cache dilewati.
+    """
+    features_list = []
+    index = []
+    for i, path in enumerate(file_paths):
+        features = load_cached_features(path)
+        if features is not None:
+            features_list.append(features)
+            index.append(i)
+    return raw_matrix(features_list, template), index
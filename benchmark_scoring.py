@@ -0,0 +1,313 @@
+"""
+Benchmark mesin penilaian AI (V1, V2, V3) dengan PDF sintetis.
+
+Mengukur secara terpisah:
+- ekstraksi : parsing PDF mentah (backend aktif, lihat pdf_extract.py) tanpa cache
+- cold      : pemanggilan engine end-to-end dengan cache kosong
+- warm      : pemanggilan engine saat teks/features sudah di cache (biaya penilaian)
+- score     : (khusus V3) score(features, template) murni di memori
+
+Setiap engine dijalankan di proses terpisah agar peak RSS-nya tidak tercampur.
+Hasil bisa disimpan ke JSON lalu dibandingkan antar commit:
+
+    python benchmark_scoring.py --output bench_baseline.json
+    python benchmark_scoring.py --compare bench_baseline.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+ENGINES = ('v1', 'v2', 'v3')
+
+TEMPLATE = {
+    'id': 0,
+    'required_keywords': 'laporan, analisis, rekomendasi, anggaran',
+    'required_sections': 'pendahuluan, pembahasan, kesimpulan, latar belakang',
+    'tipe_dokumen': 'Analitis/Data',
+    'weight_relevansi': 25,
+    'weight_struktur': 25,
+    'weight_analisis': 25,
+    'weight_keluasan': 25,
+}
+
+_VOCAB = (
+    "laporan kinerja pegawai analisis data anggaran program kegiatan target realisasi "
+    "capaian indikator evaluasi rekomendasi solusi usulan penyebab tindak lanjut "
+    "pendahuluan latar belakang pembahasan kesimpulan penutup hasil metode tujuan "
+    "pelayanan publik unit kerja bidang sekretariat koordinasi monitoring pelaporan "
+    "rapat notulensi keputusan peraturan kebijakan strategi risiko mitigasi"
+).split()
+
+
+# --- Pembuat PDF sintetis (tanpa dependensi tambahan) ---
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _page_lines(rng, words_per_page):
+    words = []
+    for _ in range(words_per_page):
+        r = rng.random()
+        if r < 0.05:
+            words.append(str(rng.randint(1, 9999)))
+        elif r < 0.07:
+            words.append(f"{rng.randint(1, 100)}%")
+        elif r < 0.08:
+            words.append(f"Rp {rng.randint(1000, 999999)}")
+        else:
+            words.append(rng.choice(_VOCAB))
+    return [' '.join(words[i:i + 12]) for i in range(0, len(words), 12)]
+
+
+def write_synthetic_pdf(path, pages, words_per_page, seed):
+    """Menulis PDF valid sederhana (font Helvetica) berisi teks acak."""
+    rng = random.Random(seed)
+    objects = []  # isi objek, index+1 = nomor objek
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for _ in range(pages):
+        lines = _page_lines(rng, words_per_page)
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line in lines:
+            ops.append(f"({_pdf_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode('latin-1')
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        ))
+    objects[catalog_id - 1] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode()
+    kids = ' '.join(f"{pid} 0 R" for pid in page_ids)
+    objects[pages_id - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref_pos = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_pos)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def build_corpus(directory, page_counts, densities, docs_per_size):
+    corpus = []
+    for pages in page_counts:
+        for density in densities:
+            for i in range(docs_per_size):
+                path = os.path.join(directory, f"synthetic_p{pages}_w{density}_{i}.pdf")
+                write_synthetic_pdf(path, pages, density, seed=pages * 100003 + density * 101 + i)
+                corpus.append({'path': path, 'pages': pages, 'density': density})
+    return corpus
+
+
+# --- Pengukuran ---
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def _summary(durations, total_words):
+    total = sum(durations)
+    return {
+        'n': len(durations),
+        'p50_ms': _percentile(durations, 50) * 1000,
+        'p95_ms': _percentile(durations, 95) * 1000,
+        'total_s': total,
+        'docs_per_s': len(durations) / total if total else 0.0,
+        'words_per_s': total_words / total if total else 0.0,
+    }
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS melaporkan byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _engine_call(engine):
+    if engine == 'v1':
+        from process_doc_ai import analyze_document_ai
+        return lambda path: analyze_document_ai(path, TEMPLATE['required_keywords'])
+    if engine == 'v2':
+        from process_submission_ai import analyze_submission_ai
+        return lambda path: analyze_submission_ai(path, TEMPLATE)
+    from ai_logic_v3 import analyze_submission_ai_v3
+    return lambda path: analyze_submission_ai_v3(path, TEMPLATE)
+
+
+def run_engine(engine, corpus, repeat, cache_dir):
+    """Dijalankan di proses tersendiri per engine."""
+    import pdf_cache
+    pdf_cache.CACHE_DIR = cache_dir
+    call = _engine_call(engine)
+    total_words = 0
+    timings = {'ekstraksi': [], 'cold': [], 'warm': []}
+    if engine == 'v3':
+        timings['score'] = []
+
+    # Satu putaran pemanasan yang tidak diukur (import backend PDF, kompilasi
+    # regex, cache stem & plan), agar engine yang dijalankan pertama tidak rugi
+    for doc in corpus:
+        pdf_cache._extract_text(doc['path'])
+        call(doc['path'])
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    for _ in range(repeat):
+        for doc in corpus:
+            start = time.perf_counter()
+            text = pdf_cache._extract_text(doc['path'])
+            timings['ekstraksi'].append(time.perf_counter() - start)
+            total_words += len(text.split())
+
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            start = time.perf_counter()
+            call(doc['path'])
+            timings['cold'].append(time.perf_counter() - start)
+
+            # Pastikan cache terisi penuh (V3 bisa berhenti lebih awal saat cold)
+            if engine == 'v3':
+                from ai_logic_v3 import extract_features, score
+                extract_features(doc['path'])
+            start = time.perf_counter()
+            call(doc['path'])
+            timings['warm'].append(time.perf_counter() - start)
+
+            if engine == 'v3':
+                features = extract_features(doc['path'])
+                start = time.perf_counter()
+                score(features, TEMPLATE)
+                timings['score'].append(time.perf_counter() - start)
+
+    result = {stage: _summary(values, total_words) for stage, values in timings.items()}
+    result['peak_rss_mb'] = _peak_rss_mb()
+    result['backend'] = pdf_cache.get_backend()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(page_counts, densities, docs_per_size, repeat, engines):
+    workdir = tempfile.mkdtemp(prefix="bench_performa_")
+    try:
+        corpus = build_corpus(workdir, page_counts, densities, docs_per_size)
+        ctx = multiprocessing.get_context('spawn')
+        results = {}
+        for engine in engines:
+            cache_dir = os.path.join(workdir, f"cache_{engine}")
+            with ctx.Pool(1) as pool:
+                results[engine] = pool.apply(run_engine, (engine, corpus, repeat, cache_dir))
+        return {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'corpus': {'pages': page_counts, 'densities': densities,
+                       'docs_per_size': docs_per_size, 'repeat': repeat, 'docs': len(corpus)},
+            'engines': results,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report):
+    print(f"Commit: {report['commit']}  |  {report['corpus']['docs']} dokumen x {report['corpus']['repeat']} ulangan")
+    print(f"{'engine':<7}{'tahap':<11}{'p50 ms':>10}{'p95 ms':>10}{'dok/detik':>12}{'kata/detik':>14}")
+    for engine, result in report['engines'].items():
+        for stage, s in result.items():
+            if stage in ('peak_rss_mb', 'backend'):
+                continue
+            print(f"{engine:<7}{stage:<11}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}"
+                  f"{s['docs_per_s']:>12.1f}{s['words_per_s']:>14.0f}")
+        print(f"{engine:<7}{'backend':<11}{result.get('backend', '-'):>10}")
+        rss = result['peak_rss_mb']
+        print(f"{engine:<7}{'peak RSS':<11}{(f'{rss:.1f} MB' if rss is not None else '-'):>10}")
+
+
+def compare(report, baseline, threshold):
+    """Bandingkan p50 dengan baseline; return True jika ada regresi > threshold."""
+    regressed = False
+    print(f"\nPerbandingan dengan baseline {baseline.get('commit')} (ambang {threshold:.0%}):")
+    for engine, result in report['engines'].items():
+        base = baseline.get('engines', {}).get(engine, {})
+        for stage, s in result.items():
+            if stage in ('peak_rss_mb', 'backend') or stage not in base:
+                continue
+            old, new = base[stage]['p50_ms'], s['p50_ms']
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  <-- REGRESI"
+                regressed = True
+            print(f"  {engine:<4}{stage:<11}{old:>9.2f} -> {new:>9.2f} ms ({change:+.1%}){flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark mesin penilaian AI dengan PDF sintetis.")
+    parser.add_argument("--pages", default="1,10,50", help="Daftar jumlah halaman (default: 1,10,50)")
+    parser.add_argument("--density", default="150,500", help="Daftar kata per halaman (default: 150,500)")
+    parser.add_argument("--docs", type=int, default=3, help="Dokumen per kombinasi ukuran (default: 3)")
+    parser.add_argument("--repeat", type=int, default=2, help="Jumlah ulangan (default: 2)")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Engine yang diukur (default: v1,v2,v3)")
+    parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    parser.add_argument("--compare", help="File JSON baseline untuk deteksi regresi")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Ambang regresi p50 (default: 0.15)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        [int(p) for p in args.pages.split(',')],
+        [int(d) for d in args.density.split(',')],
+        args.docs, args.repeat,
+        [e.strip() for e in args.engines.split(',') if e.strip()],
+    )
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Cek paritas skor AI V3 antar backend ekstraksi PDF (lihat pdf_extract.py).
+
+Setiap PDF dinilai ulang dengan setiap backend yang terpasang dan skornya
+dibandingkan dengan PyPDF2. Exit code 1 jika ada selisih:
+
+    python check_backend_parity.py uploads
+"""
+import argparse
+import os
+import sys
+import tempfile
+import pdf_cache
+from ai_logic_v3 import analyze_submission_ai_v3
+from pdf_extract import available_backends, backend_stats, get_backend, set_backend
+
+PARITY_TEMPLATE = {
+    'id': 0,
+    'required_keywords': 'laporan, analisis, rekomendasi, kinerja',
+    'required_sections': 'pendahuluan, pembahasan, kesimpulan',
+    'tipe_dokumen': 'Analitis/Data',
+    'weight_relevansi': 25,
+    'weight_struktur': 25,
+    'weight_analisis': 25,
+    'weight_keluasan': 25,
+}
+
+
+def check_parity(directory, backends=None, tolerance=0.0):
+    """
+    Nilai setiap PDF di 'directory' dengan analyze_submission_ai_v3 memakai
+    setiap backend, lalu bandingkan dengan PyPDF2 (referensi).
+    Return (daftar file, daftar selisih (file, backend, skor_pypdf2, skor_backend)).
+    """
+    backends = backends or available_backends()
+    files = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names if name.lower().endswith('.pdf')
+    )
+    original_backend, original_cache = get_backend(), pdf_cache.CACHE_DIR
+    mismatches = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="paritas_pdf_") as cache_dir:
+            # Cache terpisah agar setiap backend benar-benar mengekstrak ulang
+            pdf_cache.CACHE_DIR = cache_dir
+            scores = {}
+            for backend in dict.fromkeys(('pypdf2',) + tuple(backends)):
+                set_backend(backend)
+                scores[backend] = {path: analyze_submission_ai_v3(path, PARITY_TEMPLATE)[0] for path in files}
+            for backend in backends:
+                for path in files:
+                    ref, got = scores['pypdf2'][path], scores[backend][path]
+                    if abs(ref - got) > tolerance:
+                        mismatches.append((path, backend, ref, got))
+    finally:
+        set_backend(original_backend)
+        pdf_cache.CACHE_DIR = original_cache
+    return files, mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cek paritas skor AI V3 antar backend ekstraksi PDF.")
+    parser.add_argument("directory", nargs="?", default="uploads", help="Folder PDF contoh (default: uploads)")
+    parser.add_argument("--toleransi", type=float, default=0.0, help="Selisih skor yang masih diterima (default: 0)")
+    args = parser.parse_args(argv)
+
+    print(f"Backend tersedia: {', '.join(available_backends())}  |  aktif: {get_backend()}")
+    files, mismatches = check_parity(args.directory, tolerance=args.toleransi)
+    for row in backend_stats():
+        print(f"  {row['backend']:<10}{row['halaman']:>6} halaman  {row['ms_per_halaman']:>8.2f} ms/halaman")
+    for path, backend, ref, got in mismatches:
+        print(f"  BEDA {os.path.basename(path)} [{backend}]: pypdf2={ref:.2f} vs {got:.2f}")
+    print(f"{len(files)} PDF diperiksa, {len(mismatches)} selisih skor.")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
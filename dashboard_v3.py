@@ -2,170 +2,101 @@ import streamlit as st
 import pandas as pd
 import mysql.connector
 import os
-from datetime import datetime
-# --- IMPORT FILE AI V3 KITA ---
-from ai_logic_v3 import analyze_submission_ai_v3
+import time
+# --- Akses data bersama (query, cache & invalidasi, lihat repository.py) ---
+from repository import (
+    get_user, get_bawahan, search_subtree, get_all_kompetensi, get_tasks_for_asn,
+    VALIDATION_PAGE_SIZE, STATUS_FILTERS, get_submissions_for_atasan, count_submissions_for_atasan,
+    get_templates_for_atasan, get_template_cohort, get_kinerja_asn_overall, get_kompetensi_performance,
+    get_submissions_by_ids, filter_team_submissions, get_pending_analyses, save_ai_result,
+    create_template, update_template_weights, create_submission, validate_submission, validate_submissions,
+    invalidate_queues,
+)
+from query_cache import cache_stats
+# --- IMPORT ANTRIAN ANALISIS AI V3 ---
+from analysis_queue import submit_analysis, PENDING_CATATAN
+# --- Agregat kinerja inkremental (lihat kinerja_agg.py) ---
+from kinerja_agg import ensure_aggregates
+# --- Penyimpanan upload content-addressed (lihat upload_store.py) ---
+from upload_store import store_upload, UploadError
+# --- Indeks teks penuh dokumen submission (lihat search_index.py) ---
+from search_index import index_file, search as search_documents
+# --- Deteksi dokumen hampir sama per template (lihat near_duplicate.py) ---
+from near_duplicate import check_submission
+# --- Instrumentasi (timer/counter, lihat metrics.py) ---
+import metrics
+from pdf_extract import backend_stats
+# --- Penilaian batch NumPy untuk simulasi bobot (lihat batch_scoring.py) ---
+import numpy as np
+from batch_scoring import RAW_COLUMNS, WEIGHT_COLUMNS, score_batch, weight_matrix
+from scoring_plan import get_plan, validate_criteria
+# --- Penilaian ulang dari features di cache (tanpa membuka PDF) ---
+from ai_logic_v3 import load_cached_features, score
 
-# --- Konfigurasi Database ---
-def connect_db():
+# Durasi total satu rerun Streamlit (skrip dieksekusi ulang setiap interaksi)
+_rerun_start = time.perf_counter()
+
+# Email yang boleh melihat panel instrumentasi (pisahkan koma)
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+@st.cache_resource
+def init_aggregates():
+    """Pastikan tabel agregat kinerja ada (sekali per proses)."""
+    ensure_aggregates()
+    return True
+
+@st.cache_resource
+def init_metrics_exporter():
+    """Endpoint /metrics Prometheus jika METRICS_PORT diisi (sekali per proses)."""
     try:
-        db = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="", # GANTI DENGAN PASSWORD MYSQL ANDA
-            database="hackathon_bkn"
-        )
-        # Set auto-commit agar perubahan langsung tersimpan
-        db.autocommit = True
-        return db
-    except mysql.connector.Error as e:
-        st.error(f"Error koneksi DB: {e}")
-        return None
-
-# --- Fungsi Bantuan Database (CRUD) ---
-
-@st.cache_data(ttl=60)
-def get_user(email):
-    db = connect_db()
-    if db:
-        with db.cursor(dictionary=True) as cursor:
-            cursor.execute("SELECT * FROM asn WHERE email = %s", (email,))
-            user = cursor.fetchone()
-        db.close()
-        return user
-    return None
-
-@st.cache_data(ttl=60)
-def get_bawahan(atasan_id):
-    db = connect_db()
-    if db:
-        with db.cursor(dictionary=True) as cursor:
-            cursor.execute("SELECT * FROM asn WHERE atasan_id = %s", (atasan_id,))
-            bawahan = cursor.fetchall()
-        db.close()
-        return bawahan
-    return []
-
-@st.cache_data(ttl=60)
-def get_all_kompetensi():
-    """(Level-Up 3) Mengambil daftar kompetensi dari DB."""
-    db = connect_db()
-    if db:
-        with db.cursor(dictionary=True) as cursor:
-            cursor.execute("SELECT * FROM kompetensi ORDER BY nama_kompetensi")
-            kompetensi = cursor.fetchall()
-        db.close()
-        return kompetensi
-    return []
-
-@st.cache_data(ttl=60)
-def get_task_templates_for_asn(atasan_id):
-    """Mengambil template tugas yang ditugaskan oleh atasan."""
-    db = connect_db()
-    if db:
-        with db.cursor(dictionary=True) as cursor:
-            cursor.execute("SELECT * FROM task_templates WHERE atasan_id = %s", (atasan_id,))
-            templates = cursor.fetchall()
-            
-            # (Level-Up 3) Ambil juga kompetensi untuk setiap template
-            for t in templates:
-                cursor.execute("""
-                    SELECT k.nama_kompetensi 
-                    FROM template_kompetensi_mapping tm
-                    JOIN kompetensi k ON tm.kompetensi_id = k.id
-                    WHERE tm.template_id = %s
-                """, (t['id'],))
-                t['kompetensi_list'] = [k['nama_kompetensi'] for k in cursor.fetchall()]
-        db.close()
-        return templates
-    return []
-
-@st.cache_data(ttl=30)
-def get_submissions_for_atasan(bawahan_ids):
-    """Mengambil semua submission dari bawahan untuk divalidasi."""
-    db = connect_db()
-    if not db or not bawahan_ids:
-        return pd.DataFrame()
-    
-    placeholders = ','.join(['%s'] * len(bawahan_ids))
-    query = f"""
-        SELECT 
-            s.id as submission_id, s.file_path, s.tanggal_submit,
-            a.nama_asn,
-            t.judul_tugas, t.tipe_dokumen,
-            e.skor_ai, e.catatan_ai, e.skor_final_atasan
-        FROM task_submissions s
-        JOIN asn a ON s.asn_id = a.id
-        JOIN task_templates t ON s.template_id = t.id
-        LEFT JOIN evaluasi_kinerja e ON s.id = e.submission_id
-        WHERE s.asn_id IN ({placeholders})
-        ORDER BY s.tanggal_submit DESC
-    """
-    df = pd.read_sql(query, db, params=bawahan_ids)
-    db.close()
-    return df
-
-@st.cache_data(ttl=30)
-def get_kinerja_asn_overall(asn_id):
-    """Mengambil riwayat kinerja UMUM ASN untuk grafik (Line chart)."""
-    db = connect_db()
-    if not db:
-        return pd.DataFrame()
-    
-    query = """
-        SELECT DATE_FORMAT(s.tanggal_submit, '%Y-%m') as bulan, 
-               AVG(e.skor_final_atasan) as rata_rata_skor
-        FROM evaluasi_kinerja e
-        JOIN task_submissions s ON e.submission_id = s.id
-        WHERE s.asn_id = %s AND e.skor_final_atasan IS NOT NULL
-          AND s.tanggal_submit >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-        GROUP BY bulan
-        ORDER BY bulan ASC
-    """
-    df = pd.read_sql(query, db, params=(asn_id,))
-    db.close()
-    if not df.empty:
-        df = df.set_index('bulan')
-    return df
-
-@st.cache_data(ttl=30)
-def get_kompetensi_performance(asn_id):
-    """(Level-Up 3) Mengambil skor rata-rata per KOMPETENSI (Bar chart)."""
-    db = connect_db()
-    if not db:
-        return pd.DataFrame()
-    
-    query = """
-        SELECT 
-            k.nama_kompetensi, 
-            AVG(e.skor_final_atasan) as rata_rata_skor
-        FROM evaluasi_kinerja e
-        JOIN task_submissions s ON e.submission_id = s.id
-        JOIN template_kompetensi_mapping tm ON s.template_id = tm.template_id
-        JOIN kompetensi k ON tm.kompetensi_id = k.id
-        WHERE s.asn_id = %s AND e.skor_final_atasan IS NOT NULL
-        GROUP BY k.nama_kompetensi
-    """
-    df = pd.read_sql(query, db, params=(asn_id,))
-    db.close()
-    if not df.empty:
-        df = df.set_index('nama_kompetensi')
-    return df
-
-def check_submission_exists(asn_id, template_id):
-    db = connect_db()
-    if db:
-        with db.cursor() as cursor:
-            cursor.execute("SELECT 1 FROM task_submissions WHERE asn_id = %s AND template_id = %s", (asn_id, template_id))
-            exists = cursor.fetchone()
-        db.close()
-        return exists is not None
-    return False
-
-# --- Direktori Upload ---
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
+        return metrics.start_http_exporter() is not None
+    except OSError as e:
+        print(f"Exporter metrics gagal dijalankan: {e}")
+        return False
+
+@st.cache_resource
+def resume_pending_analyses():
+    """Antrikan ulang analisis yang tertunda (mis. setelah server restart). Sekali per proses."""
+    rows = get_pending_analyses()
+    for row in rows:
+        submit_analysis(row['submission_id'], row['file_path'], row, on_result=save_ai_result)
+    return len(rows)
+
+# --- Fungsi Bantuan UI ---
+
+def _record_rerun():
+    metrics.observe("streamlit_rerun", time.perf_counter() - _rerun_start)
+
+def stop_page():
+    """st.stop() yang tetap mencatat durasi rerun."""
+    _record_rerun()
+    st.stop()
+
+def rerun_page():
+    """st.rerun() yang tetap mencatat durasi rerun."""
+    _record_rerun()
+    st.rerun()
+
+def render_download(row, key_prefix=""):
+    """Tombol unduh yang baru membuka file PDF setelah atasan memintanya."""
+    key = f"dokumen_siap_{row['submission_id']}"
+    if not st.session_state.get(key):
+        if st.button("📄 Siapkan Dokumen", key=f"{key_prefix}siapkan_{row['submission_id']}"):
+            st.session_state[key] = True
+            rerun_page()
+        return
+    try:
+        with open(row['file_path'], "rb") as file:
+            st.download_button("Download Dokumen", file, os.path.basename(row['file_path']), "application/pdf",
+                               key=f"{key_prefix}download_{row['submission_id']}")
+    except FileNotFoundError:
+        st.error("File dokumen tidak ditemukan.")
+
+def _next_page(cursor):
+    st.session_state['validasi_kursor'].append(cursor)
+
+def _prev_page():
+    st.session_state['validasi_kursor'].pop()
 
 # =================================================================
 # --- Tampilan Aplikasi (UI) ---
@@ -176,39 +107,72 @@ st.title("🚀 PERFORMA-AI: Sistem Evaluasi Kinerja Adaptif")
 # --- Demo "Login" ---
 st.sidebar.title("Login Demo")
 email = st.sidebar.text_input("Masukkan email Anda (demo):", "budi@asn.go.id")
-user = get_user(email)
+init_metrics_exporter()
+try:
+    init_aggregates()
+    resume_pending_analyses()
+    user = get_user(email)
+except mysql.connector.Error as e:
+    st.error(f"Error koneksi DB: {e}")
+    stop_page()
 
 if not user:
     st.sidebar.error("User tidak ditemukan. Coba: 'budi@asn.go.id' atau 'citra@asn.go.id'")
-    st.stop()
+    stop_page()
 
 st.sidebar.success(f"Selamat datang, **{user['nama_asn']}**!")
 st.sidebar.write(f"Jabatan: *{user['jabatan']}*")
 
-is_atasan = user['atasan_id'] is None
+# --- Panel Admin: Instrumentasi ---
+if user['email'].lower() in ADMIN_EMAILS:
+    with st.expander("🛠️ Panel Admin: Instrumentasi"):
+        col_timer, col_lain = st.columns([3, 2])
+        with col_timer:
+            st.caption("Timer (per proses server, termasuk worker analisis)")
+            st.dataframe(pd.DataFrame(metrics.timer_rows()), hide_index=True)
+        with col_lain:
+            st.caption("Counter")
+            counters = sorted(metrics.snapshot()['counters'].items())
+            st.dataframe(pd.DataFrame(counters, columns=['metrik', 'nilai']), hide_index=True)
+            st.caption("Backend ekstraksi PDF")
+            st.dataframe(pd.DataFrame(backend_stats()), hide_index=True)
+        st.caption("Cache query")
+        st.dataframe(pd.DataFrame(cache_stats()), hide_index=True)
+        st.download_button("Ekspor Format Prometheus", metrics.prometheus_text(), "metrics.prom", "text/plain")
+        if st.button("Reset Metrik"):
+            metrics.reset()
+
 user_id = user['id']
+# Pejabat di level tengah hierarki punya atasan DAN bawahan: tampilkan kedua modul
+is_asn = user['atasan_id'] is not None
+is_atasan = not is_asn or bool(get_bawahan(user_id))
 
 # =================================================================
 # --- Tampilan 1: ASN (Bawahan) ---
 # =================================================================
-if not is_atasan:
+if is_asn:
     st.header("Modul ASN: Daftar Tugas Anda")
     st.info("Berikut adalah daftar tugas yang ditugaskan oleh atasan Anda. Upload dokumen Anda sesuai kriteria.")
 
-    templates = get_task_templates_for_asn(user['atasan_id'])
+    templates = get_tasks_for_asn(user['atasan_id'], user_id)
     
     if not templates:
         st.warning("Atasan Anda belum membuat template tugas.")
-        st.stop()
+        if not is_atasan:
+            stop_page()
+
+    if any(t['sedang_dianalisis'] for t in templates):
+        st.button("🔄 Perbarui Status Analisis AI")
 
     for template in templates:
         template_id = template['id']
         judul = template['judul_tugas']
         
-        already_submitted = check_submission_exists(user_id, template_id)
-        
-        if already_submitted:
-            st.success(f"✔️ **{judul}** (Sudah Dikerjakan)")
+        if template['sudah_submit']:
+            if template['sedang_dianalisis']:
+                st.info(f"⏳ **{judul}** (Sudah Dikerjakan, sedang dianalisis AI...)")
+            else:
+                st.success(f"✔️ **{judul}** (Sudah Dikerjakan)")
             continue
         
         with st.expander(f"📝 **{judul}** (Belum Dikerjakan)", expanded=True):
@@ -229,33 +193,37 @@ if not is_atasan:
                 submit_button = st.form_submit_button("Submit Tugas")
 
                 if submit_button and uploaded_file is not None:
-                    filename = f"{user_id}_{template_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
-                    file_path = os.path.join(UPLOAD_DIR, filename)
-                    with open(file_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    
-                    with st.spinner(f"AI V3 sedang menganalisis '{judul}'..."):
-                        # Panggil AI V3 yang baru
-                        skor_ai, catatan_ai = analyze_submission_ai_v3(file_path, template)
-                        
-                        db = connect_db()
-                        if db:
-                            with db.cursor() as cursor:
-                                cursor.execute("INSERT INTO task_submissions (template_id, asn_id, file_path) VALUES (%s, %s, %s)",
-                                               (template_id, user_id, file_path))
-                                submission_id = cursor.lastrowid
-                                
-                                cursor.execute("INSERT INTO evaluasi_kinerja (submission_id, skor_ai, catatan_ai) VALUES (%s, %s, %s)",
-                                               (submission_id, float(skor_ai), catatan_ai))
-                            db.close()
-                            
-                            st.success(f"Berhasil submit '{judul}'! Menunggu validasi atasan.")
-                            st.subheader("Hasil Pra-Penilaian AI (V3):")
-                            st.metric(label="Skor AI (Weighted)", value=f"{skor_ai:.1f} / 100")
-                            st.info(catatan_ai)
-                            
-                            st.cache_data.clear()
-                            st.rerun()
+                    try:
+                        # Disalin per-chunk, nama file = hash isi (dedup otomatis)
+                        _, file_path, sudah_ada = store_upload(uploaded_file)
+                    except UploadError as e:
+                        st.error(f"Upload ditolak: {e}")
+                    else:
+                        # File identik yang sudah pernah diekstrak tidak perlu dianalisis ulang:
+                        # dinilai ulang dari features di cache dengan kriteria & bobot template saat ini
+                        features = load_cached_features(file_path) if sudah_ada else None
+
+                        if features is not None:
+                            skor_ai, catatan_ai = score(features, get_plan(template))
+                            catatan_ai += "\n\n♻️ Dokumen identik sudah pernah dianalisis; dinilai dari hasil ekstraksi yang tersimpan."
+                        else:
+                            # Status awal: menunggu analisis (skor_ai masih kosong)
+                            skor_ai, catatan_ai = None, PENDING_CATATAN
+                        submission_id = create_submission(template_id, user_id, user['atasan_id'], file_path,
+                                                          skor_ai, catatan_ai)
+
+                        if features is not None:
+                            # Tidak dianalisis ulang, jadi indeks diisi dari features/teks di cache
+                            index_file(submission_id, file_path)
+                            catatan_mirip = check_submission(submission_id, template_id, file_path)
+                            if catatan_mirip:
+                                save_ai_result(submission_id, skor_ai, catatan_ai + catatan_mirip)
+                            st.success(f"Berhasil submit '{judul}'! Dokumen identik sudah pernah dinilai, hasil AI langsung tersedia.")
+                        else:
+                            # AI V3 berjalan di worker, halaman tidak perlu menunggu
+                            submit_analysis(submission_id, file_path, template, on_result=save_ai_result)
+                            st.success(f"Berhasil submit '{judul}'! AI V3 sedang menganalisis dokumen Anda.")
+                        rerun_page()
 
     # --- Tampilkan Dashboard Kinerja (Level-Up 3) ---
     st.header("Dashboard Kinerja Anda")
@@ -320,8 +288,12 @@ if is_atasan:
 
             st.markdown("---")
             st.markdown("4. Kriteria Penilaian (Opsional):")
-            keywords = st.text_input("Kata Kunci Wajib (pisahkan koma)", "laporan, analisis, rekomendasi")
-            sections = st.text_input("Bagian Wajib (pisahkan koma)", "pendahuluan, pembahasan, kesimpulan")
+            bantuan_kriteria = ("Opsional per istilah: 'istilah:bobot:batas', cth 'anggaran:3:5' = bobot 3, "
+                                "nilai penuh jika muncul >= 5 kali. Tanpa ':' = aturan penilaian standar.")
+            keywords = st.text_input("Kata Kunci Wajib (pisahkan koma)", "laporan, analisis, rekomendasi",
+                                     help=bantuan_kriteria)
+            sections = st.text_input("Bagian Wajib (pisahkan koma)", "pendahuluan, pembahasan, kesimpulan",
+                                     help="Opsional per bagian: 'bagian:bobot', cth 'kesimpulan:2'.")
             
             st.markdown("---")
             # (Level-Up 1) Set Bobot
@@ -337,84 +309,227 @@ if is_atasan:
 
             submit_template = st.form_submit_button("Buat Template")
 
-            if submit_template and judul and (total_bobot == 100):
-                db = connect_db()
-                if db:
-                    with db.cursor() as cursor:
-                        # Insert ke task_templates
-                        sql = """INSERT INTO task_templates 
-                                 (atasan_id, judul_tugas, required_keywords, required_sections, tipe_dokumen, 
-                                  weight_relevansi, weight_struktur, weight_analisis, weight_keluasan) 
-                                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"""
-                        val = (user_id, judul, keywords, sections, tipe_dokumen, w_rel, w_str, w_ana, w_kel)
-                        cursor.execute(sql, val)
-                        template_id = cursor.lastrowid
-                        
-                        # (Level-Up 3) Insert ke tabel mapping kompetensi
-                        kompetensi_terpilih_ids = [kompetensi_dict[nama] for nama in kompetensi_terpilih_nama]
-                        map_sql = "INSERT INTO template_kompetensi_mapping (template_id, kompetensi_id) VALUES (%s, %s)"
-                        map_val = [(template_id, k_id) for k_id in kompetensi_terpilih_ids]
-                        cursor.executemany(map_sql, map_val)
-                    
-                    db.close()
-                    st.success(f"Template '{judul}' berhasil dibuat!")
-                    st.cache_data.clear()
-                    st.rerun()
+            kriteria_error = None
+            try:
+                validate_criteria(keywords)
+                validate_criteria(sections)
+            except ValueError as e:
+                kriteria_error = str(e)
+
+            if submit_template and kriteria_error:
+                st.error(f"Gagal. {kriteria_error}")
+            elif submit_template and judul and (total_bobot == 100):
+                # (Level-Up 3) Template + mapping kompetensi dalam satu transaksi
+                kompetensi_terpilih_ids = [kompetensi_dict[nama] for nama in kompetensi_terpilih_nama]
+                create_template(user_id, judul, keywords, sections, tipe_dokumen,
+                                (w_rel, w_str, w_ana, w_kel), kompetensi_terpilih_ids)
+                st.success(f"Template '{judul}' berhasil dibuat!")
+                rerun_page()
             elif submit_template:
                 st.error("Gagal. Pastikan Judul diisi dan Total Bobot adalah 100.")
 
+    # --- Simulasi Bobot (What-If) ---
+    with st.expander("Simulasi Bobot Template (What-If)", expanded=False):
+        # Hanya template milik sendiri: bobot template atasan lain tidak bisa diubah
+        templates_saya = [t for t in get_templates_for_atasan(user_id) if t['atasan_id'] == user_id]
+        if not templates_saya:
+            st.info("Belum ada template tugas.")
+        else:
+            pilihan = {t['id']: t['judul_tugas'] for t in templates_saya}
+            sim_id = st.selectbox("Template", list(pilihan), format_func=pilihan.get, key="sim_template")
+            sim_template, df_cohort, dilewati = get_template_cohort(sim_id)
+            if df_cohort.empty:
+                st.info("Belum ada submission yang sudah dianalisis AI untuk template ini."
+                        + (f" ({len(dilewati)} submission belum punya features di cache.)" if len(dilewati) else ""))
+            else:
+                st.caption(f"{len(df_cohort)} submission disimulasikan dari features di cache"
+                           + (f" ({len(dilewati)} dilewati karena belum ada di cache)." if len(dilewati) else "."))
+                cols = st.columns(4)
+                labels = ("Relevansi", "Struktur", "Kualitas Analisis", "Keluasan")
+                bobot_sim = [
+                    col.slider(f"{label} (%)", 0, 100, int(sim_template[w]), key=f"sim_{sim_id}_{w}")
+                    for col, label, w in zip(cols, labels, WEIGHT_COLUMNS)
+                ]
+                # Bobot saat ini & simulasi dihitung sekaligus: (n x 4) @ (4 x 2)
+                skor = score_batch(df_cohort[list(RAW_COLUMNS)].to_numpy(),
+                                   np.vstack([weight_matrix([sim_template]), [bobot_sim]]))
+                df_sim = pd.DataFrame({
+                    'nama_asn': df_cohort['nama_asn'],
+                    'skor_saat_ini': skor[:, 0],
+                    'skor_simulasi': skor[:, 1],
+                    'selisih': skor[:, 1] - skor[:, 0],
+                    'sudah_divalidasi': df_cohort['skor_final_atasan'].notna(),
+                })
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Rata-rata Skor", f"{skor[:, 1].mean():.1f}", f"{(skor[:, 1] - skor[:, 0]).mean():+.1f}")
+                col2.metric("Skor Naik", int((df_sim['selisih'] > 0.05).sum()))
+                col3.metric("Skor Turun", int((df_sim['selisih'] < -0.05).sum()))
+                st.dataframe(df_sim.sort_values('selisih'), hide_index=True)
+
+                total_sim = sum(bobot_sim)
+                if total_sim != 100:
+                    st.error(f"Total Bobot harus 100! Saat ini: {total_sim}")
+                elif bobot_sim != [int(sim_template[w]) for w in WEIGHT_COLUMNS]:
+                    st.caption("Menerapkan bobot juga memperbarui skor AI submission yang belum divalidasi.")
+                    # Submission tanpa features di cache dianalisis ulang di background
+                    ulang = (dilewati[dilewati['skor_final_atasan'].isna()]
+                             if len(dilewati) else pd.DataFrame(columns=['submission_id', 'asn_id', 'file_path']))
+                    if len(ulang):
+                        st.warning(f"{len(ulang)} submission belum divalidasi tidak bisa dihitung dari cache: "
+                                   + ", ".join(f"{r['nama_asn']} (#{r['submission_id']})" for _, r in ulang.head(10).iterrows())
+                                   + (f", dan {len(ulang) - 10} lainnya" if len(ulang) > 10 else "")
+                                   + ". Skornya dikosongkan dan dianalisis ulang dengan bobot baru.")
+                    if st.button("Terapkan Bobot ke Template", key=f"sim_apply_{sim_id}"):
+                        belum = ~df_sim['sudah_divalidasi']
+                        updates = [(float(s), int(sid)) for s, sid in
+                                   zip(df_sim['skor_simulasi'][belum], df_cohort['submission_id'][belum])]
+                        pending_ids = [int(sid) for sid in ulang['submission_id']]
+                        if not update_template_weights(sim_id, user_id, bobot_sim, updates, pending_ids,
+                                                       PENDING_CATATAN):
+                            st.error("Gagal. Template ini bukan milik Anda.")
+                            stop_page()
+                        template_baru = dict(sim_template, **dict(zip(WEIGHT_COLUMNS, bobot_sim)))
+                        for _, r in ulang.iterrows():
+                            submit_analysis(int(r['submission_id']), r['file_path'], template_baru,
+                                            on_result=save_ai_result)
+                        for asn_id in set(df_cohort['asn_id'][belum]) | set(ulang['asn_id']):
+                            invalidate_queues(int(asn_id))
+                        st.success(f"Bobot diterapkan; {len(updates)} skor AI diperbarui"
+                                   + (f", {len(pending_ids)} dianalisis ulang." if pending_ids else "."))
+                        rerun_page()
+
     # --- Bagian 2: Validasi Tugas Bawahan ---
     st.header("Validasi Kinerja Tim Anda")
-    # (Logika di bagian ini sama persis dengan Opsi 2, tidak perlu diubah)
-    bawahan_list = get_bawahan(user_id)
-    if not bawahan_list: st.stop()
-    bawahan_ids = [b['id'] for b in bawahan_list]
-    df_submissions = get_submissions_for_atasan(bawahan_ids)
-    if df_submissions.empty: st.stop()
+    # Seluruh subtree organisasi (bawahan langsung maupun tidak langsung)
+    # (di-JOIN di SQL, tidak pernah diambil utuh ke Python)
+    if not get_bawahan(user_id): stop_page()
+    jumlah_status = count_submissions_for_atasan(user_id)
 
-    pending_subs = df_submissions[df_submissions['skor_final_atasan'].isna()]
-    selesai_subs = df_submissions[df_submissions['skor_final_atasan'].notna()]
+    # Pencarian teks penuh di seluruh dokumen tim (dari indeks, PDF tidak dibuka)
+    with st.expander("🔎 Cari Dokumen Tim", expanded=False):
+        kata_cari = st.text_input("Kata yang dicari (pisahkan spasi)", key="cari_dokumen")
+        if kata_cari.strip():
+            # Disaring ke subtree atasan di dalam search(), sebelum dipotong limit
+            hasil_cari = search_documents(kata_cari, limit=VALIDATION_PAGE_SIZE,
+                                          keep=lambda ids: filter_team_submissions(user_id, ids))
+            df_cari = get_submissions_by_ids(user_id, [h['submission_id'] for h in hasil_cari])
+            if df_cari.empty:
+                st.info("Tidak ada dokumen tim yang memuat kata tersebut.")
+            else:
+                detail = {h['submission_id']: h for h in hasil_cari}
+                df_cari = df_cari.copy()
+                df_cari['relevansi'] = [detail[i]['skor'] for i in df_cari['submission_id']]
+                df_cari['cocok'] = [", ".join(detail[i]['cocok']) for i in df_cari['submission_id']]
+                st.dataframe(df_cari[['nama_asn', 'judul_tugas', 'tanggal_submit', 'cocok', 'relevansi',
+                                      'skor_ai', 'skor_final_atasan']],
+                             hide_index=True,
+                             column_config={'relevansi': st.column_config.NumberColumn("Relevansi", format="%.2f")})
+                for _, row in df_cari.iterrows():
+                    st.markdown(f"**{row['nama_asn']}** - {row['judul_tugas']}")
+                    render_download(row, key_prefix="cari_")
 
-    st.subheader(f"Tugas Menunggu Validasi ({len(pending_subs)})")
-    
-    if pending_subs.empty:
-        st.success("Semua tugas sudah Anda validasi.")
-    
-    for _, row in pending_subs.iterrows():
-        expander_title = f"**{row['nama_asn']}** - {row['judul_tugas']} (Tipe: {row['tipe_dokumen']})"
-        
-        with st.expander(expander_title):
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write("**Hasil Pra-Penilaian AI (V3):**")
-                st.metric(label="Skor AI (Weighted)", value=f"{row['skor_ai']:.1f} / 100")
-                st.info(f"**Catatan AI:**\n\n{row['catatan_ai']}")
-                try:
-                    with open(row['file_path'], "rb") as file:
-                        st.download_button("Download Dokumen", file, os.path.basename(row['file_path']), "application/pdf")
-                except FileNotFoundError:
-                    st.error("File dokumen tidak ditemukan.")
+    # Filter antrian: status, ASN, template
+    col_status, col_asn, col_template = st.columns(3)
+    status = col_status.selectbox("Status", list(STATUS_FILTERS),
+                                  format_func=lambda s: f"{s} ({jumlah_status[s]})")
+    # Pilihan ASN dicari per nama (maks. 50), bukan seluruh subtree
+    cari_asn = col_asn.text_input("Cari ASN (nama)", key="cari_asn")
+    asn_options = {None: "Semua ASN",
+                   **{b['id']: "· " * (b['depth'] - 1) + b['nama_asn'] for b in search_subtree(user_id, cari_asn)}}
+    filter_asn = col_asn.selectbox("ASN", list(asn_options), format_func=asn_options.get)
+    template_options = {None: "Semua Tugas",
+                        **{t['id']: t['judul_tugas'] for t in get_templates_for_atasan(user_id)}}
+    filter_template = col_template.selectbox("Tugas", list(template_options), format_func=template_options.get)
+
+    # Tumpukan kursor halaman; kembali ke halaman 1 jika filter berubah
+    filter_key = (status, filter_asn, filter_template)
+    if st.session_state.get('validasi_filter') != filter_key:
+        st.session_state['validasi_filter'] = filter_key
+        st.session_state['validasi_kursor'] = [None]
+    kursor = st.session_state['validasi_kursor']
+
+    df_page, next_after = get_submissions_for_atasan(
+        user_id, status, filter_asn, filter_template, kursor[-1])
+
+    st.subheader(f"{status} ({jumlah_status[status]})")
+    if status == 'Menunggu Validasi' and jumlah_status['Sedang Dianalisis AI']:
+        st.caption(f"⏳ {jumlah_status['Sedang Dianalisis AI']} dokumen masih dianalisis AI dan akan muncul di sini setelah selesai.")
+
+    if df_page.empty:
+        if status == 'Menunggu Validasi':
+            st.success("Semua tugas sudah Anda validasi.")
+        else:
+            st.info("Tidak ada submission untuk filter ini.")
+    elif status == 'Menunggu Validasi' and st.toggle("Mode Validasi Massal"):
+        # Semua baris di halaman ini divalidasi sekaligus: satu transaksi, satu rerun
+        st.caption("Centang 'Validasi' pada baris yang ingin disimpan. Skor final awal = skor AI.")
+        df_grid = pd.DataFrame({
+            'validasi': True,
+            'nama_asn': df_page['nama_asn'],
+            'judul_tugas': df_page['judul_tugas'],
+            'skor_ai': df_page['skor_ai'],
+            'skor_final': df_page['skor_ai'].round(1),
+            'catatan': "",
+        })
+        with st.form("form_validasi_massal"):
+            df_edit = st.data_editor(
+                df_grid, hide_index=True, use_container_width=True,
+                disabled=['nama_asn', 'judul_tugas', 'skor_ai'],
+                column_config={
+                    'validasi': st.column_config.CheckboxColumn("Validasi"),
+                    'skor_ai': st.column_config.NumberColumn("Skor AI", format="%.1f"),
+                    'skor_final': st.column_config.NumberColumn("Skor Final", min_value=0.0, max_value=100.0, step=0.5),
+                    'catatan': st.column_config.TextColumn("Catatan/Feedback"),
+                },
+            )
+            submit_massal = st.form_submit_button("Simpan Validasi Terpilih")
+
+        if submit_massal:
+            terpilih = df_edit['validasi'] & df_edit['skor_final'].notna()
+            validations = [
+                (int(submission_id), float(skor_final), catatan or "")
+                for submission_id, skor_final, catatan in zip(
+                    df_page['submission_id'][terpilih], df_edit['skor_final'][terpilih], df_edit['catatan'][terpilih])
+            ]
+            if not validations:
+                st.warning("Tidak ada baris yang dipilih.")
+            else:
+                validate_submissions(user_id, validations)
+                st.success(f"{len(validations)} validasi berhasil disimpan!")
+                rerun_page()
+    elif status == 'Menunggu Validasi':
+        for _, row in df_page.iterrows():
+            expander_title = f"**{row['nama_asn']}** - {row['judul_tugas']} (Tipe: {row['tipe_dokumen']})"
             
-            with col2:
-                st.write("**Formulir Validasi Final:**")
-                with st.form(key=f"form_val_{row['submission_id']}"):
-                    skor_final = st.slider("Skor Final Anda:", 0.0, 100.0, float(row['skor_ai']), 0.5)
-                    catatan = st.text_area("Catatan/Feedback Anda:", "")
-                    submit_validasi = st.form_submit_button("Submit Validasi")
-
-                    if submit_validasi:
-                        db = connect_db()
-                        if db:
-                            with db.cursor() as cursor:
-                                cursor.execute("""
-                                    UPDATE evaluasi_kinerja 
-                                    SET skor_final_atasan = %s, catatan_atasan = %s, tanggal_evaluasi = NOW()
-                                    WHERE submission_id = %s
-                                """, (skor_final, catatan, row['submission_id']))
-                            db.close()
+            with st.expander(expander_title):
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.write("**Hasil Pra-Penilaian AI (V3):**")
+                    st.metric(label="Skor AI (Weighted)", value=f"{row['skor_ai']:.1f} / 100")
+                    st.info(f"**Catatan AI:**\n\n{row['catatan_ai']}")
+                    render_download(row)
+                
+                with col2:
+                    st.write("**Formulir Validasi Final:**")
+                    with st.form(key=f"form_val_{row['submission_id']}"):
+                        skor_final = st.slider("Skor Final Anda:", 0.0, 100.0, float(row['skor_ai']), 0.5)
+                        catatan = st.text_area("Catatan/Feedback Anda:", "")
+                        submit_validasi = st.form_submit_button("Submit Validasi")
+
+                        if submit_validasi:
+                            # Simpan validasi + perbarui agregat kinerja dalam satu transaksi
+                            validate_submission(user_id, row['submission_id'], skor_final, catatan)
                             st.success(f"Validasi untuk '{row['judul_tugas']}' berhasil disimpan!")
-                            st.cache_data.clear()
-                            st.rerun()
-    
-    st.subheader("Riwayat Tugas Selesai Divalidasi")
-    st.dataframe(selesai_subs[['nama_asn', 'judul_tugas', 'skor_ai', 'skor_final_atasan']])
\ No newline at end of file
+                            rerun_page()
+    elif status == 'Sedang Dianalisis AI':
+        st.dataframe(df_page[['nama_asn', 'judul_tugas', 'tanggal_submit']], hide_index=True)
+    else:
+        st.dataframe(df_page[['nama_asn', 'judul_tugas', 'skor_ai', 'skor_final_atasan']], hide_index=True)
+
+    # Navigasi halaman
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    col_prev.button("⬅️ Sebelumnya", on_click=_prev_page, disabled=len(kursor) == 1)
+    col_info.caption(f"Halaman {len(kursor)}")
+    col_next.button("Berikutnya ➡️", on_click=_next_page, args=(next_after,), disabled=next_after is None)
+
+_record_rerun()
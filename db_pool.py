@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+import mysql.connector
+from mysql.connector import pooling
+
+# --- Konfigurasi Database ---
+DB_CONFIG = {
+    'host': os.environ.get("DB_HOST", "localhost"),
+    'port': int(os.environ.get("DB_PORT", "3306")),
+    'user': os.environ.get("DB_USER", "root"),
+    'password': os.environ.get("DB_PASSWORD", ""), # GANTI DENGAN PASSWORD MYSQL ANDA
+    'database': os.environ.get("DB_NAME", "hackathon_bkn"),
+}
+# mysql.connector membatasi pool maksimal 32 koneksi
+POOL_SIZE = min(int(os.environ.get("DB_POOL_SIZE", "8")), 32)
+# Berapa lama (detik) menunggu koneksi kosong jika pool sedang penuh
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
+_pool = None
+_pool_pid = None
+_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool koneksi bersama untuk seluruh proses (dibuat sekali, lazy)."""
+    global _pool, _pool_pid
+    with _lock:
+        # Pool tidak boleh diwariskan ke proses hasil fork (worker analisis)
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = pooling.MySQLConnectionPool(
+                pool_name=f"performa_ai_{os.getpid()}",
+                pool_size=POOL_SIZE,
+                pool_reset_session=True,
+                **DB_CONFIG
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _borrow():
+    pool = get_pool()
+    deadline = time.monotonic() + POOL_TIMEOUT
+    while True:
+        try:
+            return pool.get_connection()
+        except pooling.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+
+def _recycle(db):
+    """Putuskan koneksi yang bermasalah; pool akan reconnect saat dipinjam lagi."""
+    try:
+        db._cnx.disconnect()
+    except Exception:
+        pass
+    try:
+        db.close()
+    except Exception:
+        pass
+
+
+@contextmanager
+def get_connection():
+    """
+    Meminjam koneksi dari pool bersama.
+
+    Commit otomatis jika blok selesai tanpa error dan rollback jika error.
+    Koneksi yang gagal (error MySQL) diputus sebelum dikembalikan ke pool,
+    sehingga tidak ada koneksi rusak yang dipakai ulang.
+    """
+    db = _borrow()
+    try:
+        # Health check: sambungkan ulang jika koneksi idle sudah diputus server
+        db.ping(reconnect=True, attempts=2, delay=0)
+    except mysql.connector.Error:
+        _recycle(db)
+        raise
+    try:
+        yield db
+        db.commit()
+    except mysql.connector.Error:
+        _recycle(db)
+        raise
+    except BaseException:
+        try:
+            db.rollback()
+        finally:
+            db.close()
+        raise
+    else:
+        db.close()
+
+
+@contextmanager
+def get_cursor(dictionary=False):
+    """Singkatan untuk get_connection() + cursor dalam satu blok 'with'."""
+    with get_connection() as db:
+        with db.cursor(dictionary=dictionary) as cursor:
+            yield cursor
@@ -0,0 +1,109 @@
+import os
+import signal
+import threading
+from contextlib import contextmanager
+import metrics
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# --- Batas Sumber Daya per Dokumen ---
+# PDF yang rusak/berbahaya bisa membuat parser berputar lama atau memakan
+# memori besar. Batas ini diterapkan di proses worker analisis, sehingga
+# yang gagal hanya dokumen itu, bukan server Streamlit.
+TIMEOUT_SECONDS = float(os.environ.get("ANALYSIS_TIMEOUT", "120"))
+MEMORY_LIMIT_MB = int(os.environ.get("ANALYSIS_MAX_MEMORY_MB", "2048"))  # 0 = tanpa batas
+MAX_FILE_BYTES = int(os.environ.get("ANALYSIS_MAX_FILE_MB", "50")) * 1024 * 1024
+MAX_PAGES = int(os.environ.get("ANALYSIS_MAX_PAGES", "500"))  # 0 = tanpa batas
+
+# Bisa ditegakkan di dalam proses worker (butuh SIGALRM, tidak ada di Windows)
+HAS_ALARM = hasattr(signal, 'setitimer')
+
+
+class ResourceLimitExceeded(Exception):
+    """Analisis dihentikan karena melewati batas sumber daya."""
+
+
+class AnalysisTimeout(ResourceLimitExceeded):
+    pass
+
+
+class DocumentTooLarge(ResourceLimitExceeded):
+    pass
+
+
+def timeout_catatan(seconds=None):
+    seconds = TIMEOUT_SECONDS if seconds is None else seconds
+    return (f"⏱️ Analisis AI dihentikan: melebihi batas waktu {seconds:g} detik. "
+            "Dokumen perlu diperiksa manual oleh atasan.")
+
+
+def too_large_catatan(detail):
+    return (f"📦 Analisis AI dihentikan: dokumen terlalu besar ({detail}). "
+            "Dokumen perlu diperiksa manual oleh atasan.")
+
+
+def init_worker():
+    """Initializer proses worker: batasi memori (RLIMIT_AS) jika didukung OS."""
+    if resource is None or not MEMORY_LIMIT_MB:
+        return
+    limit = MEMORY_LIMIT_MB * 1024 * 1024
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError, AttributeError) as e:
+        print(f"Batas memori worker tidak bisa dipasang: {e}")
+
+
+@contextmanager
+def time_limit(seconds):
+    """
+    Raise AnalysisTimeout jika blok berjalan lebih dari 'seconds' detik.
+    Hanya aktif di thread utama pada OS dengan SIGALRM; selain itu no-op
+    (lihat watchdog di analysis_queue.py).
+    """
+    if not seconds or not HAS_ALARM or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def _alarm(signum, frame):
+        raise AnalysisTimeout(timeout_catatan(seconds))
+
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def check_file_size(file_path):
+    size = os.path.getsize(file_path)
+    if MAX_FILE_BYTES and size > MAX_FILE_BYTES:
+        raise DocumentTooLarge(too_large_catatan(
+            f"{size / (1024 * 1024):.1f} MB, batas {MAX_FILE_BYTES // (1024 * 1024)} MB"))
+
+
+def run_guarded(func, file_path, *args):
+    """
+    Menjalankan func(file_path, *args) -> (skor, catatan) dengan batas ukuran
+    file, waktu dan memori. Batas jumlah halaman (MAX_PAGES) ditegakkan saat
+    ekstraksi teks (pdf_cache.iter_page_texts), jadi penilaian ulang dari
+    features di cache tidak membuka PDF sama sekali. Pelanggaran batas
+    menghasilkan skor 0 dengan catatan terstruktur, bukan exception.
+    """
+    try:
+        check_file_size(file_path)
+        with time_limit(TIMEOUT_SECONDS):
+            return func(file_path, *args)
+    except ResourceLimitExceeded as e:
+        metrics.incr(f"analisis_{type(e).__name__}")
+        return 0, str(e)
+    except MemoryError:
+        metrics.incr("analisis_MemoryError")
+        return 0, too_large_catatan(f"memori melebihi {MEMORY_LIMIT_MB} MB saat dibaca")
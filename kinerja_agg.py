@@ -0,0 +1,211 @@
+"""
+Tabel agregat kinerja ASN yang diperbarui secara inkremental.
+
+Daripada menghitung AVG(skor_final_atasan) dengan join 4 tabel setiap kali
+dashboard dibuka, jumlah & banyaknya skor final disimpan per ASN per bulan
+dan per ASN per kompetensi, lalu diperbarui saat atasan memvalidasi.
+
+Bangun ulang seluruh agregat (mis. setelah mapping kompetensi diubah):
+
+    python kinerja_agg.py --rebuild
+"""
+import argparse
+import sys
+from db_pool import get_cursor
+import metrics
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS agg_kinerja_bulanan (
+        asn_id INT NOT NULL,
+        bulan CHAR(7) NOT NULL,
+        total_skor DOUBLE NOT NULL DEFAULT 0,
+        jumlah INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (asn_id, bulan)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agg_kinerja_kompetensi (
+        asn_id INT NOT NULL,
+        kompetensi_id INT NOT NULL,
+        total_skor DOUBLE NOT NULL DEFAULT 0,
+        jumlah INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (asn_id, kompetensi_id)
+    )
+    """,
+]
+
+
+def ensure_aggregates():
+    """Membuat tabel agregat jika belum ada, dan mengisinya sekali jika masih kosong."""
+    with get_cursor() as cursor:
+        for sql in SCHEMA_SQL:
+            cursor.execute(sql)
+        cursor.execute("SELECT 1 FROM agg_kinerja_bulanan LIMIT 1")
+        is_empty = cursor.fetchone() is None
+        if is_empty:
+            rebuild_aggregates(cursor)
+
+
+def rebuild_aggregates(cursor):
+    """Hitung ulang seluruh agregat dari evaluasi_kinerja."""
+    cursor.execute("DELETE FROM agg_kinerja_bulanan")
+    cursor.execute("DELETE FROM agg_kinerja_kompetensi")
+    cursor.execute("""
+        INSERT INTO agg_kinerja_bulanan (asn_id, bulan, total_skor, jumlah)
+        SELECT s.asn_id, DATE_FORMAT(s.tanggal_submit, '%Y-%m'),
+               SUM(e.skor_final_atasan), COUNT(*)
+        FROM evaluasi_kinerja e
+        JOIN task_submissions s ON e.submission_id = s.id
+        WHERE e.skor_final_atasan IS NOT NULL
+        GROUP BY s.asn_id, DATE_FORMAT(s.tanggal_submit, '%Y-%m')
+    """)
+    cursor.execute("""
+        INSERT INTO agg_kinerja_kompetensi (asn_id, kompetensi_id, total_skor, jumlah)
+        SELECT s.asn_id, tm.kompetensi_id, SUM(e.skor_final_atasan), COUNT(*)
+        FROM evaluasi_kinerja e
+        JOIN task_submissions s ON e.submission_id = s.id
+        JOIN template_kompetensi_mapping tm ON s.template_id = tm.template_id
+        WHERE e.skor_final_atasan IS NOT NULL
+        GROUP BY s.asn_id, tm.kompetensi_id
+    """)
+
+
+@metrics.timed("db_record_validation")
+def record_validation(cursor, submission_id, skor_final, catatan):
+    """
+    Menyimpan validasi atasan DAN memperbarui agregat dalam transaksi yang sama.
+    Jika submission sudah pernah divalidasi, selisih skornya yang ditambahkan.
+    Return asn_id pemilik submission (None jika tidak ditemukan).
+    """
+    cursor.execute("""
+        SELECT e.skor_final_atasan, s.asn_id, s.template_id,
+               DATE_FORMAT(s.tanggal_submit, '%Y-%m')
+        FROM evaluasi_kinerja e
+        JOIN task_submissions s ON e.submission_id = s.id
+        WHERE e.submission_id = %s
+        FOR UPDATE
+    """, (submission_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    skor_lama, asn_id, template_id, bulan = row
+
+    cursor.execute("""
+        UPDATE evaluasi_kinerja
+        SET skor_final_atasan = %s, catatan_atasan = %s, tanggal_evaluasi = NOW()
+        WHERE submission_id = %s
+    """, (skor_final, catatan, submission_id))
+
+    delta_total = float(skor_final) - (float(skor_lama) if skor_lama is not None else 0.0)
+    delta_jumlah = 0 if skor_lama is not None else 1
+    cursor.execute("""
+        INSERT INTO agg_kinerja_bulanan (asn_id, bulan, total_skor, jumlah)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total_skor = total_skor + VALUES(total_skor),
+                                jumlah = jumlah + VALUES(jumlah)
+    """, (asn_id, bulan, delta_total, delta_jumlah))
+    cursor.execute("""
+        INSERT INTO agg_kinerja_kompetensi (asn_id, kompetensi_id, total_skor, jumlah)
+        SELECT %s, tm.kompetensi_id, %s, %s
+        FROM template_kompetensi_mapping tm
+        WHERE tm.template_id = %s
+        ON DUPLICATE KEY UPDATE total_skor = total_skor + VALUES(total_skor),
+                                jumlah = jumlah + VALUES(jumlah)
+    """, (asn_id, delta_total, delta_jumlah, template_id))
+    return asn_id
+
+
+@metrics.timed("db_record_validations")
+def record_validations(cursor, validations):
+    """
+    Versi massal record_validation: 'validations' berisi tuple
+    (submission_id, skor_final, catatan). Satu SELECT ... FOR UPDATE, satu
+    executemany UPDATE dan satu executemany per tabel agregat, dalam
+    transaksi yang sama. Return set asn_id yang terdampak.
+    """
+    validations = list(validations)
+    if not validations:
+        return set()
+    placeholders = ','.join(['%s'] * len(validations))
+    cursor.execute(f"""
+        SELECT e.submission_id, e.skor_final_atasan, s.asn_id, s.template_id,
+               DATE_FORMAT(s.tanggal_submit, '%Y-%m')
+        FROM evaluasi_kinerja e
+        JOIN task_submissions s ON e.submission_id = s.id
+        WHERE e.submission_id IN ({placeholders})
+        FOR UPDATE
+    """, [v[0] for v in validations])
+    rows = {row[0]: row[1:] for row in cursor.fetchall()}
+    validations = [v for v in validations if v[0] in rows]
+    if not validations:
+        return set()
+
+    cursor.executemany("""
+        UPDATE evaluasi_kinerja
+        SET skor_final_atasan = %s, catatan_atasan = %s, tanggal_evaluasi = NOW()
+        WHERE submission_id = %s
+    """, [(skor_final, catatan, submission_id) for submission_id, skor_final, catatan in validations])
+
+    # Gabungkan selisih per baris agregat sebelum ditulis
+    delta_bulanan = {}
+    delta_template = {}
+    for submission_id, skor_final, _ in validations:
+        skor_lama, asn_id, template_id, bulan = rows[submission_id]
+        delta_total = float(skor_final) - (float(skor_lama) if skor_lama is not None else 0.0)
+        delta_jumlah = 0 if skor_lama is not None else 1
+        for delta, key in ((delta_bulanan, (asn_id, bulan)), (delta_template, (asn_id, template_id))):
+            total, jumlah = delta.get(key, (0.0, 0))
+            delta[key] = (total + delta_total, jumlah + delta_jumlah)
+
+    cursor.executemany("""
+        INSERT INTO agg_kinerja_bulanan (asn_id, bulan, total_skor, jumlah)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total_skor = total_skor + VALUES(total_skor),
+                                jumlah = jumlah + VALUES(jumlah)
+    """, [(asn_id, bulan, total, jumlah) for (asn_id, bulan), (total, jumlah) in delta_bulanan.items()])
+
+    # Pecah selisih per template menjadi selisih per kompetensi
+    template_ids = sorted({template_id for _, template_id in delta_template})
+    placeholders = ','.join(['%s'] * len(template_ids))
+    cursor.execute(f"""
+        SELECT template_id, kompetensi_id FROM template_kompetensi_mapping
+        WHERE template_id IN ({placeholders})
+    """, template_ids)
+    kompetensi_map = {}
+    for template_id, kompetensi_id in cursor.fetchall():
+        kompetensi_map.setdefault(template_id, []).append(kompetensi_id)
+    delta_kompetensi = {}
+    for (asn_id, template_id), (total, jumlah) in delta_template.items():
+        for kompetensi_id in kompetensi_map.get(template_id, []):
+            key = (asn_id, kompetensi_id)
+            old_total, old_jumlah = delta_kompetensi.get(key, (0.0, 0))
+            delta_kompetensi[key] = (old_total + total, old_jumlah + jumlah)
+    if delta_kompetensi:
+        cursor.executemany("""
+            INSERT INTO agg_kinerja_kompetensi (asn_id, kompetensi_id, total_skor, jumlah)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE total_skor = total_skor + VALUES(total_skor),
+                                    jumlah = jumlah + VALUES(jumlah)
+        """, [(asn_id, kompetensi_id, total, jumlah)
+              for (asn_id, kompetensi_id), (total, jumlah) in delta_kompetensi.items()])
+    return {rows[v[0]][1] for v in validations}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kelola tabel agregat kinerja ASN.")
+    parser.add_argument("--rebuild", action="store_true", help="Hitung ulang seluruh agregat")
+    args = parser.parse_args(argv)
+    if not args.rebuild:
+        parser.print_help()
+        return 0
+    with get_cursor() as cursor:
+        for sql in SCHEMA_SQL:
+            cursor.execute(sql)
+        rebuild_aggregates(cursor)
+    print("Agregat kinerja berhasil dibangun ulang.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Instrumentasi ringan (timer & counter) untuk jalur panas penilaian dan dashboard.
+
+- timer(nama) / @timed(nama): catat durasi (jumlah, total, maksimum)
+- incr(nama): tambah counter
+- drain() / merge(): kirim metrik dari proses worker ke proses utama
+- prometheus_text(): ekspor format teks Prometheus
+- start_http_exporter(port): endpoint /metrics opsional (env METRICS_PORT)
+
+Semua nilai disimpan di memori per proses; tidak ada dependensi tambahan.
+"""
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "performa"
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))  # 0 = exporter HTTP mati
+
+_timers = {}    # nama -> [jumlah, total_detik, maks_detik]
+_counters = {}  # nama -> nilai
+_lock = threading.Lock()
+_server = None
+
+
+def observe(name, seconds):
+    """Catat satu durasi (detik) untuk timer 'name'."""
+    with _lock:
+        t = _timers.get(name)
+        if t is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            if seconds > t[2]:
+                t[2] = seconds
+
+
+def incr(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def timed(name=None):
+    """Decorator: catat durasi setiap pemanggilan fungsi (default: nama fungsi)."""
+    def decorator(func):
+        metric = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(metric, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Salinan semua metrik: {'timers': {nama: [n, total, maks]}, 'counters': {nama: nilai}}."""
+    with _lock:
+        return {
+            'timers': {name: list(t) for name, t in _timers.items()},
+            'counters': dict(_counters),
+        }
+
+
+def drain():
+    """Ambil lalu kosongkan metrik proses ini (dipakai di worker sebelum hasil dikirim)."""
+    with _lock:
+        snap = {'timers': _timers.copy(), 'counters': _counters.copy()}
+        _timers.clear()
+        _counters.clear()
+    return snap
+
+
+def merge(snap):
+    """Gabungkan hasil drain() dari proses lain ke proses ini."""
+    if not snap:
+        return
+    with _lock:
+        for name, (n, total, peak) in snap.get('timers', {}).items():
+            t = _timers.get(name)
+            if t is None:
+                _timers[name] = [n, total, peak]
+            else:
+                t[0] += n
+                t[1] += total
+                t[2] = max(t[2], peak)
+        for name, value in snap.get('counters', {}).items():
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def timer_rows():
+    """Baris ringkasan timer untuk ditampilkan di dashboard (urut total waktu)."""
+    rows = []
+    for name, (n, total, peak) in snapshot()['timers'].items():
+        rows.append({
+            'metrik': name,
+            'jumlah': n,
+            'total_detik': total,
+            'rata_ms': total * 1000 / n if n else 0.0,
+            'maks_ms': peak * 1000,
+        })
+    return sorted(rows, key=lambda r: r['total_detik'], reverse=True)
+
+
+def _metric_name(name):
+    return f"{PREFIX}_" + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def prometheus_text():
+    """Ekspor semua metrik dalam format teks Prometheus (exposition format 0.0.4)."""
+    snap = snapshot()
+    lines = []
+    for name, (n, total, peak) in sorted(snap['timers'].items()):
+        metric = _metric_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_count {n}")
+        lines.append(f"{metric}_sum {total:.6f}")
+        lines.append(f"# TYPE {metric}_max gauge")
+        lines.append(f"{metric}_max {peak:.6f}")
+    for name, value in sorted(snap['counters'].items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_exporter(port=None, host="0.0.0.0"):
+    """Jalankan endpoint /metrics di thread background (sekali per proses)."""
+    global _server
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
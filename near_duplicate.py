@@ -0,0 +1,257 @@
+"""
+Deteksi dokumen yang hampir sama (indikasi salinan) dengan MinHash + LSH.
+
+Setiap dokumen diringkas menjadi signature MinHash (NUM_PERM angka) dari
+himpunan shingle SHINGLE_SIZE kata berurutan. Signature disimpan ke SQLite
+lokal dan dipecah menjadi LSH_BANDS band; dokumen yang punya minimal satu
+band identik menjadi kandidat, lalu kemiripan Jaccard-nya diperkirakan dari
+signature. Jadi submission baru hanya dibandingkan dengan segelintir
+kandidat per template, bukan dengan setiap PDF lain.
+
+Hanya submission untuk template yang sama yang dibandingkan. Submission
+lama bisa didaftarkan dengan:
+
+    python near_duplicate.py
+
+Jika NUM_PERM / SHINGLE_SIZE / LSH_BANDS diubah, hapus file indeks
+(MINHASH_INDEX_PATH) lalu jalankan perintah di atas.
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+import numpy as np
+import metrics
+from db_pool import get_cursor
+from doc_guard import ResourceLimitExceeded
+from pdf_cache import file_digest, get_document_text
+from search_index import normalize_term
+
+INDEX_PATH = os.environ.get("MINHASH_INDEX_PATH", os.path.join(".cache", "minhash.sqlite3"))
+# Kemiripan (perkiraan Jaccard) minimal yang dilaporkan di catatan AI
+SIMILARITY_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+# 16 band x 8 baris: pasangan dengan Jaccard ~0.8 hampir pasti jadi kandidat,
+# sedangkan yang < 0.5 hampir tidak pernah (ambang LSH ~ (1/16)^(1/8) = 0.71)
+LSH_BANDS = 16
+_ROWS = NUM_PERM // LSH_BANDS
+
+# Shingle diproses per blok agar memori tetap kecil untuk dokumen panjang
+_CHUNK = 4096
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Permutasi tetap (seed konstan) agar signature antar proses bisa dibandingkan
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 32) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 32) - 1, size=NUM_PERM, dtype=np.uint64)
+
+# Penanda awal bagian kemiripan di catatan_ai
+NOTE_MARKER = "\n\n🔁 **Kemiripan Dokumen:**"
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS signature (
+        submission_id INTEGER PRIMARY KEY,
+        template_id INTEGER NOT NULL,
+        minhash BLOB NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS lsh_band (
+        template_id INTEGER NOT NULL,
+        band INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        submission_id INTEGER NOT NULL,
+        PRIMARY KEY (template_id, band, bucket, submission_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS lsh_band_submission ON lsh_band (submission_id);
+"""
+
+
+def _connect():
+    os.makedirs(os.path.dirname(INDEX_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(INDEX_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def shingles(text):
+    """Himpunan hash (crc32) dari setiap SHINGLE_SIZE kata berurutan."""
+    words = [w for w in (normalize_term(t) for t in text.split()) if w]
+    if not words:
+        return set()
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(words).encode('utf-8'))}
+    return {zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode('utf-8'))
+            for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_hashes):
+    """Signature MinHash (NUM_PERM uint32) dari himpunan hash shingle; None jika kosong."""
+    if not shingle_hashes:
+        return None
+    hv = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes))
+    signature = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    # (a*x + b) mod p untuk semua permutasi sekaligus (matriks NUM_PERM x chunk);
+    # a, x < 2^32 sehingga a*x + b tidak overflow uint64
+    for start in range(0, len(hv), _CHUNK):
+        chunk = hv[start:start + _CHUNK]
+        phv = ((np.outer(_PERM_A, chunk) + _PERM_B[:, None]) % _MERSENNE) & _MAX_HASH
+        np.minimum(signature, phv.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def similarity(sig_a, sig_b):
+    """Perkiraan kemiripan Jaccard dari dua signature."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def _buckets(signature):
+    """(band, bucket) per band; bucket = 8 byte pertama blake2b isi band."""
+    rows = signature.reshape(LSH_BANDS, _ROWS)
+    return [(band, int.from_bytes(hashlib.blake2b(rows[band].tobytes(), digest_size=8).digest(), 'big', signed=True))
+            for band in range(LSH_BANDS)]
+
+
+def signature_for_file(file_path):
+    """
+    Signature dokumen dari teks di cache pdf_cache. Entri teks bisa sudah
+    di-evict (LRU) walau features masih ada, jadi PDF di-parse ulang jika
+    perlu. None jika file tidak ada atau dokumen tanpa teks.
+    """
+    digest = file_digest(file_path)
+    if digest is None:
+        return None
+    return minhash(shingles(get_document_text(file_path, digest)['text']))
+
+
+def find_similar(template_id, signature, exclude_id=None, threshold=None):
+    """
+    Submission lain untuk template yang sama dengan kemiripan >= threshold.
+    Return list (submission_id, kemiripan) urut kemiripan tertinggi.
+    """
+    threshold = SIMILARITY_THRESHOLD if threshold is None else threshold
+    buckets = _buckets(signature)
+    values = ", ".join(["(?, ?)"] * len(buckets))
+    params = [template_id] + [v for pair in buckets for v in pair]
+    conn = _connect()
+    try:
+        candidates = conn.execute(f"""
+            SELECT DISTINCT s.submission_id, s.minhash
+            FROM lsh_band b JOIN signature s ON s.submission_id = b.submission_id
+            WHERE b.template_id = ? AND (b.band, b.bucket) IN (VALUES {values})
+        """, params).fetchall()
+    finally:
+        conn.close()
+
+    matches = []
+    for submission_id, blob in candidates:
+        if submission_id == exclude_id:
+            continue
+        sim = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+        if sim >= threshold:
+            matches.append((submission_id, sim))
+    metrics.incr("minhash_kandidat", len(candidates))
+    return sorted(matches, key=lambda m: (-m[1], m[0]))
+
+
+def register(submission_id, template_id, signature):
+    """Menyimpan (atau mengganti) signature + band LSH satu submission."""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM lsh_band WHERE submission_id = ?", (submission_id,))
+            conn.execute("INSERT OR REPLACE INTO signature (submission_id, template_id, minhash) VALUES (?, ?, ?)",
+                         (submission_id, template_id, signature.astype(np.uint32).tobytes()))
+            conn.executemany("INSERT INTO lsh_band (template_id, band, bucket, submission_id) VALUES (?, ?, ?, ?)",
+                             [(template_id, band, bucket, submission_id) for band, bucket in _buckets(signature)])
+    finally:
+        conn.close()
+
+
+def registered_ids():
+    conn = _connect()
+    try:
+        return {row[0] for row in conn.execute("SELECT submission_id FROM signature")}
+    finally:
+        conn.close()
+
+
+def similarity_note(matches):
+    """Bagian catatan_ai untuk hasil find_similar(); '' jika tidak ada yang mirip."""
+    if not matches:
+        return ""
+    daftar = ", ".join(f"submission #{submission_id} ({sim:.0%})" for submission_id, sim in matches[:5])
+    if len(matches) > 5:
+        daftar += f", dan {len(matches) - 5} lainnya"
+    return (f"{NOTE_MARKER} ⚠️ Sangat mirip dengan {daftar} untuk tugas yang sama. "
+            "Periksa kemungkinan dokumen disalin.")
+
+
+@metrics.timed("minhash_cek")
+def check_submission(submission_id, template_id, file_path):
+    """
+    Bandingkan submission dengan submission sebelumnya untuk template yang
+    sama, lalu daftarkan signature-nya. Teks biasanya diambil dari cache
+    (sudah diekstrak saat analisis). Return teks tambahan untuk catatan_ai
+    ('' jika tidak ada yang mirip). Error indeks tidak pernah menggagalkan
+    penilaian.
+    """
+    if template_id is None:
+        return ""
+    try:
+        signature = signature_for_file(file_path)
+    except (ResourceLimitExceeded, MemoryError):
+        # Batas waktu/memori analisis tetap ditangani run_guarded
+        raise
+    except Exception as e:
+        print(f"Gagal membaca teks submission {submission_id} untuk cek kemiripan: {e}")
+        metrics.incr("minhash_error")
+        return ""
+    if signature is None:
+        return ""
+    try:
+        matches = find_similar(template_id, signature, exclude_id=submission_id)
+        register(submission_id, template_id, signature)
+    except sqlite3.Error as e:
+        print(f"Gagal cek kemiripan submission {submission_id}: {e}")
+        metrics.incr("minhash_error")
+        return ""
+    if matches:
+        metrics.incr("minhash_mirip")
+    return similarity_note(matches)
+
+
+def rebuild():
+    """Mendaftarkan signature submission yang belum terdaftar (tanpa mengubah catatan_ai)."""
+    with get_cursor() as cursor:
+        cursor.execute("SELECT id, template_id, file_path FROM task_submissions ORDER BY id")
+        rows = cursor.fetchall()
+    sudah = registered_ids()
+    ok = gagal = 0
+    for submission_id, template_id, file_path in rows:
+        if submission_id in sudah:
+            continue
+        try:
+            signature = signature_for_file(file_path)
+            if signature is None:
+                continue
+            register(submission_id, template_id, signature)
+            ok += 1
+        except Exception as e:
+            print(f"Lewati submission {submission_id} ({file_path}): {e}")
+            gagal += 1
+    return ok, gagal
+
+
+def main():
+    argparse.ArgumentParser(description="Daftarkan signature MinHash submission lama.").parse_args()
+    start = time.perf_counter()
+    ok, gagal = rebuild()
+    print(f"{ok} signature didaftarkan, {gagal} gagal ({time.perf_counter() - start:.1f} detik) -> {INDEX_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Query hierarki organisasi (atasan -> bawahan bertingkat/eselon).
+
+Tabel asn hanya menyimpan atasan langsung (asn.atasan_id). Untuk atasan
+bertingkat (mis. kepala biro -> kepala bagian -> staf), seluruh subtree
+di-resolve dalam SATU query rekursif (MySQL 8+, SUBTREE_CTE) yang di-JOIN
+langsung di query pemanggil, jadi tidak perlu N query per level.
+
+Hasil query ini sebaiknya di-cache oleh pemanggil (lihat repository.py).
+Index yang disarankan: asn (atasan_id).
+"""
+
+# Batas kedalaman rekursi, sekaligus pengaman jika data atasan_id membentuk siklus
+MAX_DEPTH = 20
+
+# CTE 'subtree (id, depth)' untuk di-JOIN langsung di query lain, agar daftar
+# id bawahan tidak perlu dikirim bolak-balik sebagai IN (...).
+# Parameter: subtree_params(atasan_id), diletakkan paling depan.
+SUBTREE_CTE = """
+    WITH RECURSIVE subtree (id, depth) AS (
+        SELECT id, 1 FROM asn WHERE atasan_id = %s
+        UNION ALL
+        SELECT a.id, st.depth + 1
+        FROM asn a
+        JOIN subtree st ON a.atasan_id = st.id
+        WHERE st.depth < %s
+    )
+"""
+
+
+def subtree_params(atasan_id):
+    return (atasan_id, MAX_DEPTH)
+
+
+def fetch_ancestors(cursor, asn_id):
+    """
+    id seluruh atasan 'asn_id', dari atasan langsung sampai puncak hierarki.
+    Dipakai untuk invalidasi cache: submission seorang ASN juga tampil di
+    antrian validasi semua atasan di atasnya.
+    """
+    cursor.execute("""
+        WITH RECURSIVE chain (id, atasan_id, depth) AS (
+            SELECT id, atasan_id, 0 FROM asn WHERE id = %s
+            UNION ALL
+            SELECT a.id, a.atasan_id, c.depth + 1
+            FROM asn a
+            JOIN chain c ON a.id = c.atasan_id
+            WHERE c.depth < %s
+        )
+        SELECT id FROM chain WHERE depth > 0 ORDER BY depth
+    """, (asn_id, MAX_DEPTH))
+    return [row[0] if isinstance(row, tuple) else row['id'] for row in cursor.fetchall()]
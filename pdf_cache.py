@@ -0,0 +1,203 @@
+import hashlib
+import gzip
+import json
+import os
+import re
+import threading
+from collections import Counter
+from pdf_extract import get_backend, iter_raw_pages
+from doc_guard import MAX_PAGES as ANALYSIS_MAX_PAGES, DocumentTooLarge, too_large_catatan
+
+# --- Konfigurasi Cache ---
+# Cache disimpan di disk, dikunci dengan SHA-256 isi file + backend & versi
+# ekstraktor, sehingga file yang sama (walau beda nama) hanya di-parse sekali.
+CACHE_DIR = os.environ.get("PDF_CACHE_DIR", os.path.join(".cache", "pdf_text"))
+CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_MB", "256")) * 1024 * 1024
+# Naikkan versi ini jika cara ekstraksi/normalisasi teks berubah,
+# agar entri lama otomatis tidak terpakai lagi.
+EXTRACTOR_VERSION = "v1"
+# Batas jumlah halaman yang dibaca per dokumen (0 = tanpa batas)
+MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "0"))
+
+_CHUNK_SIZE = 1024 * 1024
+
+# Ukuran cache dilacak per proses secara inkremental; folder cache hanya
+# di-scan saat perkiraan melewati batas, atau setiap _RESCAN_EVERY penulisan
+# (agar penulisan proses lain ikut terhitung)
+_RESCAN_EVERY = 256
+_size_lock = threading.Lock()
+_size_state = {'bytes': None, 'puts': 0}
+
+
+def file_sha256(file_path):
+    """Menghitung SHA-256 dari isi file (dibaca per-chunk)."""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_digest(file_path):
+    """
+    SHA-256 isi file tanpa membacanya jika nama file sudah berupa hash
+    (upload content-addressed, lihat upload_store.py). None jika file tidak ada.
+    """
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    if re.fullmatch(r'[0-9a-f]{64}', name):
+        return name
+    try:
+        return file_sha256(file_path)
+    except OSError:
+        return None
+
+
+def _cache_tag():
+    # Backend berbeda bisa menghasilkan teks berbeda, dan teks yang dipotong
+    # MAX_PAGES tidak boleh tertukar dengan teks lengkap
+    tag = f"{get_backend()}-{EXTRACTOR_VERSION}"
+    return f"{tag}-p{MAX_PAGES}" if MAX_PAGES else tag
+
+
+def _cache_path(digest, kind):
+    # Fan-out 2 karakter agar satu folder tidak berisi ribuan file
+    return os.path.join(CACHE_DIR, digest[:2], f"{digest}.{_cache_tag()}.{kind}.json.gz")
+
+
+def cache_get(digest, kind):
+    """Mengambil entri cache (dict) atau None jika tidak ada / rusak."""
+    path = _cache_path(digest, kind)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Tandai sebagai baru dipakai (LRU berbasis mtime)
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return payload
+
+
+def cache_put(digest, kind, payload):
+    """Menyimpan entri cache secara atomik, lalu evict jika melebihi batas."""
+    path = _cache_path(digest, kind)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        old_size = os.path.getsize(path)
+    except OSError:
+        old_size = 0
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    new_size = os.path.getsize(tmp_path)
+    os.replace(tmp_path, path)
+    _account(new_size - old_size)
+
+
+def _account(delta):
+    """Perbarui perkiraan ukuran cache; scan + evict hanya jika perlu (bukan setiap penulisan)."""
+    with _size_lock:
+        _size_state['puts'] += 1
+        rescan = _size_state['bytes'] is None or _size_state['puts'] % _RESCAN_EVERY == 0
+        if not rescan:
+            _size_state['bytes'] += delta
+            rescan = _size_state['bytes'] > CACHE_MAX_BYTES
+    if rescan:
+        total = _evict_if_needed()
+        with _size_lock:
+            _size_state['bytes'] = total
+
+
+def _evict_if_needed():
+    """
+    Hapus entri yang paling lama tidak dipakai sampai ukuran cache di bawah
+    batas. Return ukuran cache setelahnya (byte).
+    """
+    entries = []
+    total = 0
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if not name.endswith(".json.gz"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    if total <= CACHE_MAX_BYTES:
+        return total
+
+    # Turunkan sampai 90% batas agar tidak evict di setiap penulisan
+    target = CACHE_MAX_BYTES * 0.9
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+def iter_page_texts(file_path, max_pages=None):
+    """
+    Generator teks per halaman (lowercase + spasi pemisah), dibaca lazily.
+    "".join() dari seluruh hasilnya sama dengan teks dokumen utuh.
+    DocumentTooLarge saat halaman ke-(ANALYSIS_MAX_PAGES + 1) tercapai; PDF
+    tidak perlu dibuka dua kali untuk menghitung halamannya lebih dulu.
+    """
+    if max_pages is None:
+        max_pages = MAX_PAGES
+    pages = iter_raw_pages(file_path)
+    try:
+        for i, text in enumerate(pages):
+            if max_pages and i >= max_pages:
+                break
+            if ANALYSIS_MAX_PAGES and i >= ANALYSIS_MAX_PAGES:
+                raise DocumentTooLarge(too_large_catatan(
+                    f"lebih dari {ANALYSIS_MAX_PAGES} halaman"))
+            # Spasi antar halaman agar kata kunci tidak tergabung
+            yield text.lower() + " "
+    finally:
+        pages.close()
+
+
+def _extract_text(file_path):
+    """Membaca seluruh halaman PDF menjadi satu teks lowercase."""
+    return "".join(iter_page_texts(file_path))
+
+
+def get_document_text(file_path, digest=None):
+    """
+    Mengambil teks dokumen yang sudah dinormalisasi (lowercase), daftar kata,
+    dan Counter frekuensi kata. PDF hanya di-parse jika belum ada di cache.
+
+    Return dict: {'sha256', 'text', 'words', 'word_freq'}
+    """
+    if digest is None:
+        digest = file_sha256(file_path)
+    cached = cache_get(digest, "text")
+    if cached is not None:
+        return {
+            'sha256': digest,
+            'text': cached['text'],
+            'words': cached['words'],
+            'word_freq': Counter(cached['word_freq']),
+        }
+
+    return store_document_text(digest, _extract_text(file_path))
+
+
+def store_document_text(digest, text, word_freq=None):
+    """Menyimpan teks dokumen (dan turunannya) ke cache; return dict seperti get_document_text."""
+    words = text.split()
+    if word_freq is None:
+        word_freq = Counter(words)
+    cache_put(digest, "text", {'text': text, 'words': words, 'word_freq': word_freq})
+    return {'sha256': digest, 'text': text, 'words': words, 'word_freq': word_freq}
@@ -0,0 +1,149 @@
+"""
+Backend ekstraksi teks PDF yang bisa diganti.
+
+PyPDF2 (murni Python) selalu tersedia sebagai fallback; library yang lebih
+cepat dipakai otomatis jika terpasang, dengan urutan BACKEND_PREFERENCE.
+Paksa backend tertentu dengan env PDF_BACKEND (cth: PDF_BACKEND=pypdf2).
+Cek paritas skor antar backend: lihat check_backend_parity.py.
+"""
+import importlib.util
+import os
+import time
+import metrics
+
+# Nama backend -> modul Python yang dibutuhkan
+BACKEND_MODULES = {
+    'pymupdf': 'fitz',
+    'pypdfium2': 'pypdfium2',
+    'pypdf': 'pypdf',
+    'pypdf2': 'PyPDF2',
+}
+# Urutan pemilihan otomatis: tercepat lebih dulu, PyPDF2 sebagai fallback
+BACKEND_PREFERENCE = ('pymupdf', 'pypdfium2', 'pypdf', 'pypdf2')
+
+_selected = None
+
+
+# --- Implementasi per backend: generator teks mentah per halaman ---
+
+def _pages_pymupdf(file_path):
+    import fitz
+    with fitz.open(file_path) as doc:
+        for page in doc:
+            yield page.get_text()
+
+
+def _pages_pypdfium2(file_path):
+    import pypdfium2
+    pdf = pypdfium2.PdfDocument(file_path)
+    try:
+        for page in pdf:
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+
+def _pages_pypdf(file_path):
+    import pypdf
+    with open(file_path, 'rb') as f:
+        for page in pypdf.PdfReader(f).pages:
+            yield page.extract_text() or ""
+
+
+def _pages_pypdf2(file_path):
+    import PyPDF2
+    with open(file_path, 'rb') as f:
+        for page in PyPDF2.PdfReader(f).pages:
+            yield page.extract_text() or ""
+
+
+_BACKENDS = {
+    'pymupdf': _pages_pymupdf,
+    'pypdfium2': _pages_pypdfium2,
+    'pypdf': _pages_pypdf,
+    'pypdf2': _pages_pypdf2,
+}
+
+
+def available_backends():
+    """Backend yang library-nya terpasang, urut sesuai preferensi."""
+    return [name for name in BACKEND_PREFERENCE
+            if importlib.util.find_spec(BACKEND_MODULES[name]) is not None]
+
+
+def get_backend():
+    """Backend aktif (dipilih sekali per proses)."""
+    global _selected
+    if _selected is None:
+        forced = os.environ.get("PDF_BACKEND", "").strip().lower()
+        available = available_backends()
+        if forced:
+            if forced not in available:
+                raise ValueError(f"PDF_BACKEND '{forced}' tidak tersedia. Tersedia: {', '.join(available)}")
+            _selected = forced
+        else:
+            _selected = available[0] if available else 'pypdf2'
+    return _selected
+
+
+def set_backend(name):
+    """Ganti backend aktif (dipakai cek paritas dan benchmark)."""
+    global _selected
+    if name not in _BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {name}")
+    _selected = name
+
+
+def iter_raw_pages(file_path, backend=None):
+    """
+    Generator teks mentah per halaman dengan backend aktif (atau 'backend').
+    Waktu buka dokumen (sampai halaman pertama), total waktu ekstraksi dan
+    jumlah halaman dicatat per backend di metrics, termasuk jika pembacaan
+    dihentikan lebih awal oleh pemanggil.
+    """
+    backend = backend or get_backend()
+    pages = 0
+    elapsed = 0.0
+    iterator = _BACKENDS[backend](file_path)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                text = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+            if pages == 0:
+                metrics.observe(f"pdf_buka_{backend}", elapsed)
+            pages += 1
+            yield text
+    finally:
+        iterator.close()
+        metrics.observe(f"pdf_ekstraksi_{backend}", elapsed)
+        metrics.incr(f"pdf_halaman_{backend}", pages)
+
+
+def backend_stats():
+    """Statistik waktu ekstraksi per backend (dari metrics proses ini)."""
+    snap = metrics.snapshot()
+    rows = []
+    for name in _BACKENDS:
+        timer = snap['timers'].get(f"pdf_ekstraksi_{name}")
+        if timer is None:
+            continue
+        dokumen, detik, _ = timer
+        halaman = snap['counters'].get(f"pdf_halaman_{name}", 0)
+        rows.append({
+            'backend': name,
+            'dokumen': dokumen,
+            'halaman': halaman,
+            'detik': detik,
+            'ms_per_halaman': detik * 1000 / halaman if halaman else 0.0,
+        })
+    return rows
@@ -1,6 +1,6 @@
-import PyPDF2
 import re
 import os
+from pdf_cache import get_document_text
 
 def analyze_document_ai(file_path, task_keywords_str):
     """
@@ -8,14 +8,9 @@ def analyze_document_ai(file_path, task_keywords_str):
     Versi baru: Menganalisis berdasarkan kata kunci tugas yang dinamis.
     """
     try:
-        # 1. Buka dan baca file PDF
-        text = ""
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            num_pages = len(reader.pages)
-            for page in reader.pages:
-                # Menambahkan spasi antar halaman untuk memastikan kata kunci tidak tergabung
-                text += page.extract_text().lower() + " "
+        # 1. Ambil teks PDF (dari cache jika file yang sama pernah dibaca)
+        doc = get_document_text(file_path)
+        text = doc['text']
 
         skor = 0
         catatan = []
@@ -44,7 +39,7 @@ def analyze_document_ai(file_path, task_keywords_str):
 
         # Kriteria 2: Keluasan / Kedalaman (Bobot 30)
         # Menghitung jumlah kata total dalam dokumen
-        word_count = len(text.split())
+        word_count = len(doc['words'])
         if word_count > 1000:
             skor += 30
             catatan.append(f"✔️ Dokumen komprehensif ({word_count} kata).")
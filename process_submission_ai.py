@@ -1,7 +1,6 @@
-import PyPDF2
 import re
 import os
-from collections import Counter
+from pdf_cache import get_document_text
 
 def analyze_submission_ai(file_path, template):
     """
@@ -12,18 +11,15 @@ def analyze_submission_ai(file_path, template):
     { 'required_keywords': 'laporan,absen', 'required_sections': 'pendahuluan,analisis' }
     """
     try:
-        # 1. Buka dan baca file PDF
-        text = ""
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text().lower() + " "
+        # 1. Ambil teks PDF (dari cache jika file yang sama pernah dibaca)
+        doc = get_document_text(file_path)
+        text = doc['text']
 
         skor = 0
         catatan = []
-        words = text.split()
+        words = doc['words']
         word_count = len(words)
-        word_freq = Counter(words)
+        word_freq = doc['word_freq']
 
         # --- Kriteria 1: Relevansi Kata Kunci (Bobot 40) ---
         # (Berdasarkan 'required_keywords' dari template)
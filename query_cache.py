@@ -0,0 +1,102 @@
+import functools
+import inspect
+import threading
+import time
+import metrics
+
+# --- Cache Query per-Kunci ---
+# Pengganti st.cache_data untuk fungsi data-access: setiap entri dikunci
+# dengan (nama fungsi, argumen), sehingga invalidasi bisa ditargetkan
+# (mis. hanya submission milik satu atasan) tanpa menghapus cache user lain.
+#
+# Catatan: nilai yang dikembalikan dipakai bersama oleh semua sesi,
+# jadi pemanggil TIDAK boleh mengubah (mutate) hasilnya.
+
+MAX_ENTRIES = 5000
+
+_entries = {}  # (nama, args) -> (expires_at, value)
+_stats = {}    # nama -> {'hit': n, 'miss': n, 'invalidate': n}
+_lock = threading.Lock()
+
+
+def _count(name, field, n=1):
+    stats = _stats.setdefault(name, {'hit': 0, 'miss': 0, 'invalidate': 0})
+    stats[field] += n
+
+
+def _prune(now):
+    """Buang entri kadaluarsa, lalu entri tertua jika masih melebihi batas."""
+    for key in [k for k, (expires_at, _) in _entries.items() if expires_at <= now]:
+        del _entries[key]
+    while len(_entries) > MAX_ENTRIES:
+        del _entries[next(iter(_entries))]
+
+
+def cached(ttl):
+    """
+    Decorator cache dengan TTL (detik). Argumen fungsi harus hashable.
+    Argumen keyword dinormalisasi ke urutan parameter, jadi f(1, b=2) dan
+    f(1, 2) memakai entri yang sama.
+
+    Fungsi hasil decorator punya atribut:
+    - .invalidate(*prefix): hapus entri yang argumennya diawali 'prefix'
+      (tanpa argumen = hapus semua entri fungsi ini)
+    """
+    def decorator(func):
+        name = func.__name__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if kwargs or len(args) < len(signature.parameters):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                args = tuple(bound.arguments.values())
+            key = (name, args)
+            now = time.monotonic()
+            with _lock:
+                entry = _entries.get(key)
+                if entry is not None and entry[0] > now:
+                    _count(name, 'hit')
+                    return entry[1]
+                _count(name, 'miss')
+
+            # Hanya cache miss yang benar-benar menjalankan query ke DB
+            with metrics.timer(f"db_{name}"):
+                value = func(*args)
+
+            with _lock:
+                _entries[key] = (now + ttl, value)
+                if len(_entries) > MAX_ENTRIES:
+                    _prune(now)
+            return value
+
+        wrapper.invalidate = functools.partial(invalidate, name)
+        return wrapper
+    return decorator
+
+
+def invalidate(name, *prefix):
+    """Hapus entri cache fungsi 'name' yang argumennya diawali 'prefix'."""
+    with _lock:
+        keys = [k for k in _entries if k[0] == name and k[1][:len(prefix)] == prefix]
+        for key in keys:
+            del _entries[key]
+        _count(name, 'invalidate', len(keys))
+
+
+def cache_stats():
+    """Statistik hit/miss per fungsi, untuk ditampilkan di dashboard."""
+    with _lock:
+        rows = []
+        for name, stats in sorted(_stats.items()):
+            total = stats['hit'] + stats['miss']
+            rows.append({
+                'fungsi': name,
+                'hit': stats['hit'],
+                'miss': stats['miss'],
+                'hit_rate': stats['hit'] / total if total else 0.0,
+                'invalidate': stats['invalidate'],
+                'entri': sum(1 for k in _entries if k[0] == name),
+            })
+        return rows
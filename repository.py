@@ -0,0 +1,536 @@
+"""
+Lapisan akses data bersama untuk dashboard_v3.py dan dashboard_app.py.
+
+Semua query memakai parameter (%s) lewat pool koneksi bersama (db_pool.py)
+dengan semantik transaksi yang sama: satu blok get_cursor() = satu transaksi,
+commit otomatis jika sukses dan rollback jika error. Fungsi baca di-cache
+per-kunci (query_cache.py); setiap fungsi tulis menginvalidasi entri yang
+terdampak, sehingga kedua dashboard selalu melihat data yang konsisten.
+
+Hasil berupa dict bertipe (TypedDict) atau NamedTuple, jadi tetap bisa
+diakses seperti row['kolom'] oleh kode lama.
+"""
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple, TypedDict
+import pandas as pd
+import metrics
+from db_pool import get_connection, get_cursor
+from query_cache import cached
+from kinerja_agg import record_validation, record_validations
+from org_tree import SUBTREE_CTE, fetch_ancestors, subtree_params
+from batch_scoring import RAW_COLUMNS, cohort_raw_scores
+from scoring_plan import invalidate_plan
+
+
+# --- Tipe Hasil ---
+
+class Asn(TypedDict):
+    id: int
+    nama_asn: str
+    email: str
+    jabatan: str
+    atasan_id: Optional[int]
+
+
+class AsnNode(TypedDict):
+    id: int
+    nama_asn: str
+    atasan_id: Optional[int]
+    depth: int   # 1 = bawahan langsung
+
+
+class Kompetensi(TypedDict):
+    id: int
+    nama_kompetensi: str
+
+
+class TaskTemplate(TypedDict):
+    id: int
+    atasan_id: int
+    judul_tugas: str
+    required_keywords: str
+    required_sections: str
+    tipe_dokumen: str
+    weight_relevansi: int
+    weight_struktur: int
+    weight_analisis: int
+    weight_keluasan: int
+
+
+class TaskForAsn(TaskTemplate):
+    sudah_submit: int
+    sedang_dianalisis: int
+    kompetensi_list: List[str]
+
+
+class TemplateOption(TypedDict):
+    id: int
+    atasan_id: int
+    judul_tugas: str
+
+
+class ValidationPage(NamedTuple):
+    rows: pd.DataFrame
+    next_after: Optional[Tuple[datetime, int]]
+
+
+class TemplateCohort(NamedTuple):
+    template: Optional[TaskTemplate]
+    submissions: pd.DataFrame
+    dilewati: pd.DataFrame  # submission tanpa features di cache (tidak disimulasikan)
+
+
+# --- Baca (di-cache) ---
+
+@cached(ttl=60)
+def get_user(email) -> Optional[Asn]:
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT * FROM asn WHERE email = %s", (email,))
+        return cursor.fetchone()
+
+
+@cached(ttl=60)
+def get_bawahan(atasan_id) -> List[Asn]:
+    """Bawahan langsung seorang atasan."""
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT * FROM asn WHERE atasan_id = %s", (atasan_id,))
+        return cursor.fetchall()
+
+
+@cached(ttl=60)
+def search_subtree(atasan_id, nama="", limit=50) -> List[AsnNode]:
+    """
+    Maksimal 'limit' ASN di subtree atasan yang namanya memuat 'nama'
+    (kosong = bawahan terdekat dulu), untuk filter antrian. Subtree tidak
+    pernah diambil utuh ke Python.
+    """
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute(f"""
+            {SUBTREE_CTE}
+            SELECT a.id, a.nama_asn, a.atasan_id, st.depth
+            FROM subtree st
+            JOIN asn a ON a.id = st.id
+            WHERE a.nama_asn LIKE %s
+            ORDER BY st.depth, a.nama_asn
+            LIMIT %s
+        """, (*subtree_params(atasan_id), f"%{nama.strip()}%", limit))
+        return cursor.fetchall()
+
+
+@cached(ttl=300)
+def get_ancestors(asn_id) -> Tuple[int, ...]:
+    """Rantai atasan seorang ASN (atasan langsung lebih dulu), sebagai tuple."""
+    with get_cursor() as cursor:
+        return tuple(fetch_ancestors(cursor, asn_id))
+
+
+@cached(ttl=60)
+def get_all_kompetensi() -> List[Kompetensi]:
+    """(Level-Up 3) Mengambil daftar kompetensi dari DB."""
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT * FROM kompetensi ORDER BY nama_kompetensi")
+        return cursor.fetchall()
+
+
+@cached(ttl=60)
+def get_tasks_for_asn(atasan_id, asn_id) -> List[TaskForAsn]:
+    """
+    Mengambil template tugas dari atasan beserta daftar kompetensi dan status
+    submission ASN ini ('sudah_submit', 'sedang_dianalisis'). Selalu 2 query,
+    berapa pun jumlah template yang dibuat atasan.
+    """
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT t.*,
+                   MAX(s.id IS NOT NULL) AS sudah_submit,
+                   MAX(s.id IS NOT NULL AND e.skor_ai IS NULL) AS sedang_dianalisis
+            FROM task_templates t
+            LEFT JOIN task_submissions s ON s.template_id = t.id AND s.asn_id = %s
+            LEFT JOIN evaluasi_kinerja e ON e.submission_id = s.id
+            WHERE t.atasan_id = %s
+            GROUP BY t.id
+        """, (asn_id, atasan_id))
+        templates = cursor.fetchall()
+        if not templates:
+            return []
+        
+        # (Level-Up 3) Kompetensi untuk SEMUA template sekaligus
+        template_ids = [t['id'] for t in templates]
+        placeholders = ','.join(['%s'] * len(template_ids))
+        cursor.execute(f"""
+            SELECT tm.template_id, k.nama_kompetensi 
+            FROM template_kompetensi_mapping tm
+            JOIN kompetensi k ON tm.kompetensi_id = k.id
+            WHERE tm.template_id IN ({placeholders})
+        """, template_ids)
+        kompetensi_map = {}
+        for k in cursor.fetchall():
+            kompetensi_map.setdefault(k['template_id'], []).append(k['nama_kompetensi'])
+    
+    for t in templates:
+        t['kompetensi_list'] = kompetensi_map.get(t['id'], [])
+    return templates
+
+
+# --- Antrian Validasi (paginasi keyset) ---
+# Halaman diurutkan (tanggal_submit, id) menurun; kursor = (tanggal_submit, id)
+# baris terakhir halaman sebelumnya, jadi query tidak pernah memakai OFFSET.
+# Subtree atasan di-JOIN lewat CTE rekursif (org_tree.SUBTREE_CTE), jadi id
+# bawahan tidak pernah dikirim sebagai parameter, berapa pun besar timnya.
+# Index yang disarankan: task_submissions (asn_id, tanggal_submit, id).
+VALIDATION_PAGE_SIZE = 20
+
+STATUS_FILTERS = {
+    'Menunggu Validasi': "e.skor_ai IS NOT NULL AND e.skor_final_atasan IS NULL",
+    'Sedang Dianalisis AI': "e.skor_ai IS NULL",
+    'Selesai Divalidasi': "e.skor_final_atasan IS NOT NULL",
+}
+
+
+@cached(ttl=30)
+def get_submissions_for_atasan(atasan_id, status, asn_id=None, template_id=None,
+                               after=None, limit=VALIDATION_PAGE_SIZE) -> ValidationPage:
+    """
+    Mengambil SATU halaman submission subtree atasan dengan status tertentu.
+    Cache dikunci per atasan_id.
+    Return ValidationPage(rows=DataFrame halaman, next_after=kursor berikutnya atau None).
+    """
+    conditions = [STATUS_FILTERS[status]]
+    params = list(subtree_params(atasan_id))
+    if asn_id is not None:
+        conditions.append("s.asn_id = %s")
+        params.append(asn_id)
+    if template_id is not None:
+        conditions.append("s.template_id = %s")
+        params.append(template_id)
+    if after is not None:
+        conditions.append("(s.tanggal_submit < %s OR (s.tanggal_submit = %s AND s.id < %s))")
+        params.extend([after[0], after[0], after[1]])
+    # Ambil 1 baris lebih untuk mengetahui apakah masih ada halaman berikutnya
+    params.append(limit + 1)
+
+    query = f"""
+        {SUBTREE_CTE}
+        SELECT 
+            s.id as submission_id, s.asn_id, s.file_path, s.tanggal_submit,
+            a.nama_asn,
+            t.judul_tugas, t.tipe_dokumen, t.required_keywords, t.required_sections,
+            e.skor_ai, e.catatan_ai, e.skor_final_atasan
+        FROM task_submissions s
+        JOIN subtree st ON st.id = s.asn_id
+        JOIN asn a ON s.asn_id = a.id
+        JOIN task_templates t ON s.template_id = t.id
+        JOIN evaluasi_kinerja e ON s.id = e.submission_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY s.tanggal_submit DESC, s.id DESC
+        LIMIT %s
+    """
+    with get_connection() as db:
+        df = pd.read_sql(query, db, params=params)
+
+    next_after = None
+    if len(df) > limit:
+        df = df.iloc[:limit]
+        last = df.iloc[-1]
+        next_after = (last['tanggal_submit'].to_pydatetime(), int(last['submission_id']))
+    return ValidationPage(df, next_after)
+
+
+@cached(ttl=30)
+def count_submissions_for_atasan(atasan_id) -> Dict[str, int]:
+    """Jumlah submission subtree atasan per status antrian (untuk label filter)."""
+    columns = ', '.join(f"COALESCE(SUM({cond}), 0)" for cond in STATUS_FILTERS.values())
+    with get_cursor() as cursor:
+        cursor.execute(f"""
+            {SUBTREE_CTE}
+            SELECT {columns}
+            FROM task_submissions s
+            JOIN subtree st ON st.id = s.asn_id
+            JOIN evaluasi_kinerja e ON s.id = e.submission_id
+        """, subtree_params(atasan_id))
+        row = cursor.fetchone()
+    return {status: int(n) for status, n in zip(STATUS_FILTERS, row)}
+
+
+@cached(ttl=60)
+def get_templates_for_atasan(atasan_id) -> List[TemplateOption]:
+    """
+    Daftar template milik atasan dan atasan lain di subtree-nya,
+    untuk filter antrian validasi.
+    """
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute(f"""
+            {SUBTREE_CTE}
+            SELECT id, atasan_id, judul_tugas FROM task_templates
+            WHERE atasan_id = %s OR atasan_id IN (SELECT id FROM subtree)
+            ORDER BY judul_tugas
+        """, (*subtree_params(atasan_id), atasan_id))
+        return cursor.fetchall()
+
+
+@cached(ttl=60)
+def get_template_cohort(template_id) -> TemplateCohort:
+    """
+    Template + seluruh submission-nya beserta 4 skor mentah dari features di
+    cache (untuk simulasi bobot). Submission yang features-nya belum ada di
+    cache tidak disimulasikan; barisnya dikembalikan di 'dilewati'.
+    """
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT * FROM task_templates WHERE id = %s", (template_id,))
+        template = cursor.fetchone()
+        cursor.execute("""
+            SELECT s.id AS submission_id, s.asn_id, a.nama_asn, s.file_path,
+                   e.skor_ai, e.skor_final_atasan
+            FROM task_submissions s
+            JOIN asn a ON s.asn_id = a.id
+            JOIN evaluasi_kinerja e ON e.submission_id = s.id
+            WHERE s.template_id = %s AND e.skor_ai IS NOT NULL
+        """, (template_id,))
+        rows = cursor.fetchall()
+    if template is None or not rows:
+        return TemplateCohort(template, pd.DataFrame(), pd.DataFrame())
+
+    raw, index = cohort_raw_scores([r['file_path'] for r in rows], template)
+    df = pd.DataFrame([rows[i] for i in index])
+    for j, col in enumerate(RAW_COLUMNS):
+        df[col] = raw[:, j] if len(index) else []
+    simulated = set(index)
+    dilewati = pd.DataFrame([r for i, r in enumerate(rows) if i not in simulated])
+    return TemplateCohort(template, df, dilewati)
+
+
+@cached(ttl=30)
+def get_kinerja_asn_overall(asn_id) -> pd.DataFrame:
+    """Mengambil riwayat kinerja UMUM ASN untuk grafik (Line chart), dari tabel agregat."""
+    query = """
+        SELECT bulan, total_skor / jumlah as rata_rata_skor
+        FROM agg_kinerja_bulanan
+        WHERE asn_id = %s AND jumlah > 0
+          AND bulan >= DATE_FORMAT(DATE_SUB(NOW(), INTERVAL 6 MONTH), '%Y-%m')
+        ORDER BY bulan ASC
+    """
+    with get_connection() as db:
+        df = pd.read_sql(query, db, params=(asn_id,))
+    if not df.empty:
+        df = df.set_index('bulan')
+    return df
+
+
+@cached(ttl=30)
+def get_kompetensi_performance(asn_id) -> pd.DataFrame:
+    """(Level-Up 3) Mengambil skor rata-rata per KOMPETENSI (Bar chart), dari tabel agregat."""
+    query = """
+        SELECT 
+            k.nama_kompetensi, 
+            a.total_skor / a.jumlah as rata_rata_skor
+        FROM agg_kinerja_kompetensi a
+        JOIN kompetensi k ON a.kompetensi_id = k.id
+        WHERE a.asn_id = %s AND a.jumlah > 0
+    """
+    with get_connection() as db:
+        df = pd.read_sql(query, db, params=(asn_id,))
+    if not df.empty:
+        df = df.set_index('nama_kompetensi')
+    return df
+
+
+# --- Baca (tanpa cache) ---
+
+@metrics.timed("db_get_submissions_by_ids")
+def get_submissions_by_ids(atasan_id, submission_ids) -> pd.DataFrame:
+    """
+    Detail submission (mis. hasil pencarian teks) yang dikirim subtree
+    'atasan_id'; id milik ASN lain dibuang. Urutan mengikuti 'submission_ids'.
+    """
+    if not submission_ids:
+        return pd.DataFrame()
+    query = f"""
+        {SUBTREE_CTE}
+        SELECT s.id AS submission_id, s.asn_id, s.file_path, s.tanggal_submit,
+               a.nama_asn, t.judul_tugas, e.skor_ai, e.skor_final_atasan
+        FROM task_submissions s
+        JOIN subtree st ON st.id = s.asn_id
+        JOIN asn a ON s.asn_id = a.id
+        JOIN task_templates t ON s.template_id = t.id
+        JOIN evaluasi_kinerja e ON s.id = e.submission_id
+        WHERE s.id IN ({','.join(['%s'] * len(submission_ids))})
+    """
+    with get_connection() as db:
+        df = pd.read_sql(query, db, params=list(subtree_params(atasan_id)) + list(submission_ids))
+    if df.empty:
+        return df
+    urutan = {submission_id: i for i, submission_id in enumerate(submission_ids)}
+    return df.sort_values('submission_id', key=lambda ids: ids.map(urutan)).reset_index(drop=True)
+
+
+@metrics.timed("db_filter_team_submissions")
+def filter_team_submissions(atasan_id, submission_ids) -> List[int]:
+    """id di 'submission_ids' yang dikirim ASN di subtree 'atasan_id' (untuk saringan pencarian)."""
+    if not submission_ids:
+        return []
+    with get_cursor() as cursor:
+        cursor.execute(f"""
+            {SUBTREE_CTE}
+            SELECT s.id FROM task_submissions s
+            JOIN subtree st ON st.id = s.asn_id
+            WHERE s.id IN ({','.join(['%s'] * len(submission_ids))})
+        """, list(subtree_params(atasan_id)) + list(submission_ids))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_pending_analyses():
+    """Submission yang skor AI-nya belum ada (beserta kolom template), untuk diantrikan ulang."""
+    with get_cursor(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT t.*, s.id AS submission_id, s.file_path
+            FROM evaluasi_kinerja e
+            JOIN task_submissions s ON e.submission_id = s.id
+            JOIN task_templates t ON s.template_id = t.id
+            WHERE e.skor_ai IS NULL
+        """)
+        return cursor.fetchall()
+
+
+# --- Tulis ---
+
+@metrics.timed("db_save_ai_result")
+def save_ai_result(submission_id, skor_ai, catatan_ai):
+    """Dipanggil oleh antrian analisis setelah worker selesai."""
+    with get_cursor() as cursor:
+        cursor.execute("""
+            UPDATE evaluasi_kinerja SET skor_ai = %s, catatan_ai = %s
+            WHERE submission_id = %s
+        """, (float(skor_ai), catatan_ai, submission_id))
+        cursor.execute("""
+            SELECT s.asn_id, a.atasan_id
+            FROM task_submissions s JOIN asn a ON s.asn_id = a.id
+            WHERE s.id = %s
+        """, (submission_id,))
+        owner = cursor.fetchone()
+    if owner:
+        asn_id, atasan_id = owner
+        invalidate_after_submission(atasan_id, asn_id)
+
+
+@metrics.timed("db_create_template")
+def create_template(atasan_id, judul, keywords, sections, tipe_dokumen=None, weights=None, kompetensi_ids=()):
+    """
+    Membuat template tugas (+ mapping kompetensi) dalam satu transaksi.
+    'weights' = (relevansi, struktur, analisis, keluasan); kolom yang tidak
+    diisi memakai default tabel. Return id template baru.
+    """
+    columns = ['atasan_id', 'judul_tugas', 'required_keywords', 'required_sections']
+    values = [atasan_id, judul, keywords, sections]
+    if tipe_dokumen is not None:
+        columns.append('tipe_dokumen')
+        values.append(tipe_dokumen)
+    if weights is not None:
+        columns += ['weight_relevansi', 'weight_struktur', 'weight_analisis', 'weight_keluasan']
+        values += list(weights)
+    placeholders = ', '.join(['%s'] * len(values))
+    with get_cursor() as cursor:
+        cursor.execute(f"INSERT INTO task_templates ({', '.join(columns)}) VALUES ({placeholders})", values)
+        template_id = cursor.lastrowid
+        if kompetensi_ids:
+            cursor.executemany("INSERT INTO template_kompetensi_mapping (template_id, kompetensi_id) VALUES (%s, %s)",
+                               [(template_id, k_id) for k_id in kompetensi_ids])
+    invalidate_after_template_change(atasan_id)
+    return template_id
+
+
+@metrics.timed("db_update_template_weights")
+def update_template_weights(template_id, atasan_id, weights, skor_updates=(), pending_ids=(), pending_catatan=None):
+    """
+    Mengganti bobot template milik 'atasan_id' dan (opsional) skor_ai
+    submission-nya dalam satu transaksi. 'skor_updates' = [(skor_ai, submission_id)].
+    Submission di 'pending_ids' (tidak bisa dihitung ulang dari cache) dikosongkan
+    skor_ai-nya dengan 'pending_catatan', agar skor lama tidak tertinggal;
+    pemanggil mengantrikan analisis ulangnya.
+    Return False (tanpa mengubah apa pun) jika template bukan milik 'atasan_id'.
+    """
+    with get_cursor() as cursor:
+        # Cek kepemilikan lewat SELECT, bukan rowcount UPDATE: MySQL melaporkan
+        # 0 baris terdampak juga jika bobotnya tidak berubah
+        cursor.execute("SELECT id FROM task_templates WHERE id = %s AND atasan_id = %s FOR UPDATE",
+                       (template_id, atasan_id))
+        if cursor.fetchone() is None:
+            return False
+        cursor.execute("""
+            UPDATE task_templates
+            SET weight_relevansi = %s, weight_struktur = %s,
+                weight_analisis = %s, weight_keluasan = %s
+            WHERE id = %s AND atasan_id = %s
+        """, (*weights, template_id, atasan_id))
+        if skor_updates:
+            cursor.executemany("UPDATE evaluasi_kinerja SET skor_ai = %s WHERE submission_id = %s",
+                               list(skor_updates))
+        if pending_ids:
+            cursor.executemany("UPDATE evaluasi_kinerja SET skor_ai = NULL, catatan_ai = %s WHERE submission_id = %s",
+                               [(pending_catatan, submission_id) for submission_id in pending_ids])
+    invalidate_after_template_change(atasan_id)
+    get_template_cohort.invalidate(template_id)
+    invalidate_plan(template_id)
+    return True
+
+
+@metrics.timed("db_create_submission")
+def create_submission(template_id, asn_id, atasan_id, file_path, skor_ai=None, catatan_ai=None):
+    """
+    Menyimpan submission + baris evaluasi_kinerja dalam satu transaksi.
+    skor_ai None = masih menunggu analisis AI. Return id submission baru.
+    """
+    with get_cursor() as cursor:
+        cursor.execute("INSERT INTO task_submissions (template_id, asn_id, file_path) VALUES (%s, %s, %s)",
+                       (template_id, asn_id, file_path))
+        submission_id = cursor.lastrowid
+        cursor.execute("INSERT INTO evaluasi_kinerja (submission_id, skor_ai, catatan_ai) VALUES (%s, %s, %s)",
+                       (submission_id, None if skor_ai is None else float(skor_ai), catatan_ai))
+    invalidate_after_submission(atasan_id, asn_id)
+    return submission_id
+
+
+def validate_submission(atasan_id, submission_id, skor_final, catatan):
+    """Validasi final atasan (+ agregat kinerja) dalam satu transaksi."""
+    with get_cursor() as cursor:
+        asn_id = record_validation(cursor, int(submission_id), skor_final, catatan)
+    if asn_id is not None:
+        invalidate_after_validation(atasan_id, asn_id)
+    return asn_id
+
+
+def validate_submissions(atasan_id, validations):
+    """Versi massal validate_submission: [(submission_id, skor_final, catatan)]."""
+    with get_cursor() as cursor:
+        asn_ids = record_validations(cursor, validations)
+    for asn_id in asn_ids:
+        invalidate_after_validation(atasan_id, asn_id)
+    return asn_ids
+
+
+# --- Invalidasi Cache Tertarget ---
+# Hanya entri yang terdampak yang dihapus, bukan seluruh cache server.
+# Data seorang ASN tampil di antrian SEMUA atasan di atasnya, jadi
+# invalidasi antrian mengikuti rantai atasan (get_ancestors).
+
+
+def invalidate_after_template_change(atasan_id):
+    get_tasks_for_asn.invalidate(atasan_id)
+    for id_atasan in (atasan_id,) + get_ancestors(atasan_id):
+        get_templates_for_atasan.invalidate(id_atasan)
+
+
+def invalidate_queues(asn_id):
+    for id_atasan in get_ancestors(asn_id):
+        get_submissions_for_atasan.invalidate(id_atasan)
+        count_submissions_for_atasan.invalidate(id_atasan)
+
+
+def invalidate_after_submission(atasan_id, asn_id):
+    get_tasks_for_asn.invalidate(atasan_id, asn_id)
+    invalidate_queues(asn_id)
+
+
+def invalidate_after_validation(atasan_id, asn_id):
+    invalidate_queues(asn_id)
+    get_kinerja_asn_overall.invalidate(asn_id)
+    get_kompetensi_performance.invalidate(asn_id)
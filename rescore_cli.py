@@ -0,0 +1,179 @@
+"""
+CLI untuk menilai ulang (re-scoring) banyak submission sekaligus dengan AI V3.
+
+Dipakai ketika atasan mengubah bobot/kriteria template setelah banyak ASN
+sudah submit. Contoh:
+
+    python rescore_cli.py --template-id 3
+    python rescore_cli.py --atasan-id 1 --dari 2025-01-01 --sampai 2025-03-31 --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import mysql.connector
+from ai_logic_v3 import extract_features, score
+from db_pool import get_connection
+from doc_guard import init_worker, run_guarded
+from near_duplicate import check_submission
+from scoring_plan import get_plan
+
+
+def load_templates(db, template_id=None, atasan_id=None):
+    """Mengambil template yang akan dinilai ulang, dikunci dengan id."""
+    query = "SELECT * FROM task_templates WHERE 1=1"
+    params = []
+    if template_id is not None:
+        query += " AND id = %s"
+        params.append(template_id)
+    if atasan_id is not None:
+        query += " AND atasan_id = %s"
+        params.append(atasan_id)
+    with db.cursor(dictionary=True) as cursor:
+        cursor.execute(query, params)
+        return {t['id']: t for t in cursor.fetchall()}
+
+
+def stream_submissions(db, template_ids, dari=None, sampai=None):
+    """Generator baris submission (tanpa memuat semuanya ke memori)."""
+    placeholders = ','.join(['%s'] * len(template_ids))
+    query = f"""
+        SELECT s.id AS submission_id, s.file_path, s.template_id
+        FROM task_submissions s
+        JOIN evaluasi_kinerja e ON s.id = e.submission_id
+        WHERE s.template_id IN ({placeholders})
+    """
+    params = list(template_ids)
+    if dari:
+        query += " AND s.tanggal_submit >= %s"
+        params.append(dari)
+    if sampai:
+        query += " AND s.tanggal_submit < DATE_ADD(%s, INTERVAL 1 DAY)"
+        params.append(sampai)
+    query += " ORDER BY s.id"
+
+    # Cursor unbuffered: baris diambil dari server sedikit demi sedikit
+    cursor = db.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(query, params)
+        for row in cursor:
+            yield row
+    finally:
+        cursor.close()
+
+
+def _score_full(file_path, template, submission_id):
+    plan = get_plan(template)
+    skor, catatan = score(extract_features(file_path, plan.sections), plan)
+    # Catatan ditulis ulang, jadi hasil cek kemiripan ikut dihitung ulang
+    return skor, catatan + check_submission(submission_id, template['id'], file_path)
+
+
+def _score_one(submission_id, file_path, template):
+    """
+    Dijalankan di proses worker. Sama seperti analyze_submission_ai_v3, tapi
+    features dokumen diekstrak penuh (tanpa early-exit) agar tersimpan di cache
+    dan penilaian ulang berikutnya tidak perlu membuka PDF lagi.
+    Batas waktu/ukuran/memori sama dengan antrian analisis (doc_guard.py).
+    """
+    try:
+        skor, catatan = run_guarded(_score_full, file_path, template, submission_id)
+    except Exception as e:
+        print(f"Error saat memproses PDF: {e}")
+        skor, catatan = 0, f"Error: Gagal memproses file PDF. {e}"
+    return float(skor), catatan, submission_id
+
+
+def write_results(db, rows):
+    """Menulis hasil ke evaluasi_kinerja dalam satu executemany."""
+    with db.cursor() as cursor:
+        cursor.executemany(
+            "UPDATE evaluasi_kinerja SET skor_ai = %s, catatan_ai = %s WHERE submission_id = %s",
+            rows
+        )
+    db.commit()
+
+
+def rescore(template_id=None, atasan_id=None, dari=None, sampai=None,
+            workers=None, batch_size=200, dry_run=False):
+    # Dua koneksi: satu untuk membaca (streaming), satu untuk menulis hasil
+    with get_connection() as read_db, get_connection() as write_db:
+        templates = load_templates(read_db, template_id, atasan_id)
+        if not templates:
+            print("Tidak ada template yang cocok dengan filter.")
+            return 0
+        processed = _rescore_templates(read_db, write_db, templates, dari, sampai,
+                                       workers, batch_size, dry_run)
+    return processed
+
+
+def _rescore_templates(read_db, write_db, templates, dari, sampai, workers, batch_size, dry_run):
+    workers = workers or os.cpu_count() or 2
+    max_in_flight = workers * 4
+    processed = 0
+    batch = []
+    start = time.perf_counter()
+
+    def collect(done):
+        nonlocal processed
+        for future in done:
+            batch.append(future.result())
+            processed += 1
+        if len(batch) >= batch_size:
+            flush()
+
+    def flush():
+        if not batch:
+            return
+        if not dry_run:
+            write_results(write_db, batch)
+        batch.clear()
+        elapsed = time.perf_counter() - start
+        print(f"  {processed} dokumen dinilai ulang ({processed / elapsed:.1f} dok/detik)")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        in_flight = set()
+        for row in stream_submissions(read_db, list(templates), dari, sampai):
+            template = templates[row['template_id']]
+            in_flight.add(executor.submit(_score_one, row['submission_id'], row['file_path'], template))
+            # Batasi jumlah tugas yang menunggu agar memori tetap kecil
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+        done, _ = wait(in_flight)
+        collect(done)
+    flush()
+
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    print(f"Selesai: {processed} dokumen dalam {elapsed:.1f} detik ({rate:.1f} dok/detik)"
+          + (" [dry-run, tidak ada yang ditulis]" if dry_run else ""))
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nilai ulang submission dengan AI V3 secara paralel.")
+    parser.add_argument("--template-id", type=int, help="Hanya submission untuk template ini")
+    parser.add_argument("--atasan-id", type=int, help="Semua template milik atasan ini")
+    parser.add_argument("--dari", help="Tanggal submit awal (YYYY-MM-DD)")
+    parser.add_argument("--sampai", help="Tanggal submit akhir (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, help="Jumlah proses worker (default: jumlah core)")
+    parser.add_argument("--batch", type=int, default=200, help="Ukuran batch executemany (default: 200)")
+    parser.add_argument("--dry-run", action="store_true", help="Hitung skor tanpa menulis ke database")
+    args = parser.parse_args(argv)
+
+    if args.template_id is None and args.atasan_id is None:
+        parser.error("Wajib mengisi --template-id atau --atasan-id")
+
+    try:
+        rescore(args.template_id, args.atasan_id, args.dari, args.sampai,
+                args.workers, args.batch, args.dry_run)
+    except mysql.connector.Error as e:
+        print(f"Error koneksi DB: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Template tugas yang sudah "dikompilasi" untuk penilaian V3.
+
+String required_keywords / required_sections di template hanya di-parse
+sekali menjadi ScoringPlan (immutable), lalu dipakai ulang untuk setiap
+dokumen. Cache dikunci id template + fingerprint kolom penilaian, jadi
+begitu atasan mengubah template (bobot, kriteria, tipe dokumen), plan lama
+otomatis tidak terpakai lagi, termasuk di proses worker analisis yang
+tidak bisa dijangkau invalidate_plan().
+
+Setiap kata kunci / bagian boleh diberi bobot dan batas frekuensi dengan
+sintaks 'istilah:bobot:batas' (cth: 'anggaran:3:5, laporan, penutup:2').
+Template tanpa bobot sama sekali tetap dinilai dengan aturan lama. Istilah
+lain yang kebetulan berisi ':' (cth: 'jam 08:00') tetap dibaca apa adanya,
+jadi template lama tidak pernah gagal dikompilasi.
+"""
+import re
+import threading
+import metrics
+from tokenizer import stem_phrase
+
+# Kolom template yang memengaruhi penilaian (urutan = urutan fingerprint)
+PLAN_COLUMNS = (
+    'required_keywords', 'required_sections', 'tipe_dokumen',
+    'weight_relevansi', 'weight_struktur', 'weight_analisis', 'weight_keluasan',
+)
+
+# Akhiran ':bobot[:batas]' setelah istilah yang diakhiri huruf (bukan angka,
+# agar '08:00' tidak dibaca sebagai bobot)
+_CRITERIA_RE = re.compile(r"^(.*[^\d\s:])\s*:\s*(\d+(?:\.\d+)?)\s*(?::\s*(\d+))?$")
+# Item yang jelas dimaksudkan sebagai kriteria ('anggaran:...'), untuk validasi form
+_CRITERIA_ATTEMPT_RE = re.compile(r"^[^:]*[^\d\s:]\s*:")
+
+_plans = {}  # id template (atau fingerprint jika tanpa id) -> ScoringPlan
+_lock = threading.Lock()
+
+
+def split_terms(value):
+    """'a, B ,c' -> ['a', 'b', 'c'] (lowercase, tanpa istilah kosong)."""
+    return [t.strip().lower() for t in (value or '').split(',') if t.strip()]
+
+
+def _parse_item(item):
+    """(istilah, bobot, batas) jika 'item' memakai sintaks bobot yang valid, selain itu None."""
+    match = _CRITERIA_RE.match(item)
+    if match is None:
+        return None
+    term, bobot, batas = match.group(1).strip(), float(match.group(2)), int(match.group(3) or 1)
+    if bobot <= 0 or batas < 1:
+        return None
+    return term, bobot, batas
+
+
+def parse_criteria(value):
+    """
+    'laporan:3:5, Analisis' -> [('laporan', 3.0, 5), ('analisis', 1.0, 1)].
+    Bobot default 1, batas frekuensi default 1 (cukup muncul sekali). Item
+    yang bukan sintaks bobot valid dipakai utuh sebagai istilah; fungsi ini
+    tidak pernah raise (validasi ada di validate_criteria).
+    """
+    return [_parse_item(item) or (item, 1.0, 1) for item in split_terms(value)]
+
+
+def has_weights(value):
+    """True jika minimal satu istilah memakai sintaks 'istilah:bobot[:batas]'."""
+    return any(_parse_item(item) is not None for item in split_terms(value))
+
+
+def validate_criteria(value):
+    """
+    Untuk form template: ValueError jika ada item yang tampak seperti
+    kriteria berbobot ('anggaran:x', 'anggaran:0') tetapi tidak valid.
+    """
+    for item in split_terms(value):
+        if _CRITERIA_ATTEMPT_RE.match(item) and _parse_item(item) is None:
+            raise ValueError(f"Format kriteria tidak valid: '{item}' "
+                             "(gunakan istilah:bobot:batas, bobot > 0 dan batas bulat >= 1)")
+
+
+def plan_fingerprint(template):
+    return tuple(template.get(col) for col in PLAN_COLUMNS)
+
+
+class ScoringPlan:
+    """
+    Hasil kompilasi satu template:
+    - keywords / sections: tuple istilah yang sudah dinormalisasi
+    - keyword_stems: bentuk dasar setiap kata kunci (tuple per kata kunci)
+    - keyword_weights / keyword_caps, section_weights: bobot & batas frekuensi
+      per istilah (default 1)
+    - keywords_weighted / sections_weighted: True jika kata kunci / bagian
+      memakai sintaks 'istilah:bobot:batas' (masing-masing terpisah)
+    - single_word_sections: bagian satu kata (boleh dicocokkan lewat token)
+    - weights: (relevansi, struktur, analisis, keluasan) sebagai float
+    - is_analitis: tipe dokumen 'Analitis/Data'
+    Tidak bisa diubah setelah dibuat (aman dibagi antar thread).
+    """
+    __slots__ = ('template_id', 'fingerprint', 'keywords', 'keyword_stems', 'keyword_weights', 'keyword_caps',
+                 'sections', 'section_weights', 'single_word_sections', 'keywords_weighted', 'sections_weighted',
+                 'weights', 'tipe_dokumen', 'is_analitis')
+
+    def __init__(self, template):
+        raw_keywords = template.get('required_keywords', '')
+        raw_sections = template.get('required_sections', '')
+        keyword_criteria = parse_criteria(raw_keywords)
+        section_criteria = parse_criteria(raw_sections)
+        keywords = tuple(term for term, _, _ in keyword_criteria)
+        sections = tuple(term for term, _, _ in section_criteria)
+        values = {
+            'template_id': template.get('id'),
+            'fingerprint': plan_fingerprint(template),
+            'keywords': keywords,
+            'keyword_stems': tuple(stem_phrase(k) for k in keywords),
+            'keyword_weights': tuple(bobot for _, bobot, _ in keyword_criteria),
+            'keyword_caps': tuple(batas for _, _, batas in keyword_criteria),
+            'sections': sections,
+            'section_weights': tuple(bobot for _, bobot, _ in section_criteria),
+            'keywords_weighted': has_weights(raw_keywords),
+            'sections_weighted': has_weights(raw_sections),
+            'single_word_sections': frozenset(s for s in sections if len(s.split()) == 1),
+            'weights': tuple(float(template[col]) for col in PLAN_COLUMNS[3:]),
+            'tipe_dokumen': template['tipe_dokumen'],
+            'is_analitis': template['tipe_dokumen'] == 'Analitis/Data',
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ScoringPlan tidak bisa diubah; buat plan baru dari template")
+
+    def __delattr__(self, name):
+        raise AttributeError("ScoringPlan tidak bisa diubah; buat plan baru dari template")
+
+    def __repr__(self):
+        return f"ScoringPlan(template_id={self.template_id!r}, keywords={self.keywords!r}, sections={self.sections!r})"
+
+
+def get_plan(template):
+    """
+    ScoringPlan untuk 'template' (dict dari database), dari cache jika
+    template belum berubah. ScoringPlan yang diberikan langsung dikembalikan.
+    """
+    if isinstance(template, ScoringPlan):
+        return template
+    fingerprint = plan_fingerprint(template)
+    key = template.get('id')
+    if key is None:
+        key = fingerprint
+    plan = _plans.get(key)
+    if plan is not None and plan.fingerprint == fingerprint:
+        return plan
+    metrics.incr("v3_plan_kompilasi")
+    plan = ScoringPlan(template)
+    with _lock:
+        _plans[key] = plan
+    return plan
+
+
+def invalidate_plan(template_id=None):
+    """Buang plan satu template (atau semuanya) dari cache proses ini."""
+    with _lock:
+        if template_id is None:
+            _plans.clear()
+        else:
+            _plans.pop(template_id, None)
@@ -0,0 +1,202 @@
+"""
+Indeks teks penuh (inverted index) seluruh dokumen submission.
+
+Token dokumen yang dihitung saat analisis AI (features['token_counts'])
+disimpan ke SQLite lokal sebagai posting: istilah -> (submission_id, frekuensi).
+Indeks diperbarui per dokumen setiap kali analisis selesai, jadi pencarian
+lintas dokumen tidak perlu membuka PDF lagi. Hasil diurutkan dengan TF-IDF.
+
+Isi indeks yang belum ada (mis. submission lama) bisa dibangun dengan:
+
+    python search_index.py            # hanya submission yang belum terindeks
+    python search_index.py --semua    # indeks ulang semuanya
+"""
+import argparse
+import math
+import os
+import sqlite3
+import time
+from collections import Counter
+import metrics
+from ai_logic_v3 import extract_features, load_cached_features
+from db_pool import get_cursor
+from doc_guard import ResourceLimitExceeded
+from tokenizer import normalize_token
+
+# Hasil pencarian disaring (mis. hanya dokumen tim atasan) per blok sebesar ini
+FILTER_BATCH = 500
+
+INDEX_PATH = os.environ.get("SEARCH_INDEX_PATH", os.path.join(".cache", "search_index.sqlite3"))
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS dokumen (
+        submission_id INTEGER PRIMARY KEY,
+        sha256 TEXT,
+        jumlah_kata INTEGER NOT NULL,
+        diindeks REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS posting (
+        istilah TEXT NOT NULL,
+        submission_id INTEGER NOT NULL,
+        frekuensi INTEGER NOT NULL,
+        PRIMARY KEY (istilah, submission_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS posting_submission ON posting (submission_id);
+"""
+
+
+def _connect():
+    os.makedirs(os.path.dirname(INDEX_PATH) or ".", exist_ok=True)
+    # Ditulis dari beberapa proses worker sekaligus: tunggu lock, jangan gagal
+    conn = sqlite3.connect(INDEX_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def normalize_term(token):
+    """Bentuk istilah di indeks (cth: 'Laporan,' -> 'laporan'), '' jika kosong."""
+    return normalize_token(token)
+
+
+def _postings(token_counts):
+    terms = Counter()
+    for token, n in token_counts.items():
+        term = normalize_term(token)
+        if term:
+            terms[term] += n
+    return terms
+
+
+@metrics.timed("indeks_tulis")
+def index_document(submission_id, features):
+    """
+    Menyimpan (atau mengganti) posting satu submission dari features hasil
+    ekstraksi lengkap. Features 'partial' (early-exit) tidak diindeks.
+    Return True jika dokumen terindeks.
+    """
+    if features.get('partial'):
+        return False
+    terms = _postings(features['token_counts'])
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM posting WHERE submission_id = ?", (submission_id,))
+            conn.executemany("INSERT INTO posting (istilah, submission_id, frekuensi) VALUES (?, ?, ?)",
+                             [(term, submission_id, n) for term, n in terms.items()])
+            conn.execute("INSERT OR REPLACE INTO dokumen (submission_id, sha256, jumlah_kata, diindeks) VALUES (?, ?, ?, ?)",
+                         (submission_id, features.get('sha256'), features['word_count'], time.time()))
+    finally:
+        conn.close()
+    return True
+
+
+def index_file(submission_id, file_path):
+    """
+    Mengindeks submission dari features lengkap di cache. Jika belum ada
+    (mis. analisis berhenti lebih awal), features diekstrak penuh: dari cache
+    teks jika ada, baru PDF-nya di-parse. Dipakai setelah analisis selesai dan
+    untuk submission yang memakai ulang hasil file identik. Error indeks tidak
+    pernah menggagalkan penilaian.
+    """
+    try:
+        features = load_cached_features(file_path) or extract_features(file_path)
+        return index_document(submission_id, features)
+    except (ResourceLimitExceeded, MemoryError):
+        # Batas waktu/memori analisis tetap ditangani run_guarded
+        raise
+    except Exception as e:
+        print(f"Gagal mengindeks submission {submission_id}: {e}")
+        metrics.incr("indeks_error")
+        return False
+
+
+def indexed_ids():
+    conn = _connect()
+    try:
+        return {row[0] for row in conn.execute("SELECT submission_id FROM dokumen")}
+    finally:
+        conn.close()
+
+
+@metrics.timed("indeks_cari")
+def search(query, limit=50, keep=None):
+    """
+    Mencari submission yang memuat istilah di 'query' (dipisah spasi).
+    Skor = jumlah (1 + log tf) * log(1 + N / df) per istilah yang cocok,
+    dokumen yang memuat lebih banyak istilah query otomatis lebih tinggi.
+
+    'keep' (opsional) menyaring hasil SEBELUM dipotong 'limit': dipanggil
+    dengan list submission_id (maks. FILTER_BATCH, urut skor) dan
+    mengembalikan id yang boleh tampil, mis. hanya dokumen subtree atasan.
+
+    Return list dict {'submission_id', 'skor', 'cocok': [istilah]} urut skor
+    tertinggi, maksimal 'limit' baris (None = semua).
+    """
+    terms = list(dict.fromkeys(t for t in (normalize_term(w) for w in query.split()) if t))
+    if not terms:
+        return []
+    placeholders = ','.join(['?'] * len(terms))
+    conn = _connect()
+    try:
+        total_docs = conn.execute("SELECT COUNT(*) FROM dokumen").fetchone()[0]
+        df = dict(conn.execute(f"""
+            SELECT istilah, COUNT(*) FROM posting
+            WHERE istilah IN ({placeholders}) GROUP BY istilah
+        """, terms).fetchall())
+        rows = conn.execute(f"""
+            SELECT submission_id, istilah, frekuensi FROM posting
+            WHERE istilah IN ({placeholders})
+        """, terms).fetchall()
+    finally:
+        conn.close()
+
+    results = {}
+    for submission_id, term, tf in rows:
+        hit = results.setdefault(submission_id, {'submission_id': submission_id, 'skor': 0.0, 'cocok': []})
+        hit['skor'] += (1 + math.log(tf)) * math.log(1 + total_docs / df[term])
+        hit['cocok'].append(term)
+    ranked = sorted(results.values(), key=lambda r: (-r['skor'], -r['submission_id']))
+    if keep is not None:
+        kept = []
+        for start in range(0, len(ranked), FILTER_BATCH):
+            batch = ranked[start:start + FILTER_BATCH]
+            allowed = set(keep([r['submission_id'] for r in batch]))
+            kept.extend(r for r in batch if r['submission_id'] in allowed)
+            if limit is not None and len(kept) >= limit:
+                break
+        ranked = kept
+    return ranked if limit is None else ranked[:limit]
+
+
+def rebuild(semua=False):
+    """Mengindeks submission yang belum terindeks (atau semuanya) dari database."""
+    with get_cursor() as cursor:
+        cursor.execute("SELECT id, file_path FROM task_submissions ORDER BY id")
+        rows = cursor.fetchall()
+    sudah = set() if semua else indexed_ids()
+    ok = gagal = 0
+    for submission_id, file_path in rows:
+        if submission_id in sudah:
+            continue
+        try:
+            # Ekstraksi lengkap; features tersimpan di cache untuk penilaian berikutnya
+            index_document(submission_id, extract_features(file_path))
+            ok += 1
+        except Exception as e:
+            print(f"Lewati submission {submission_id} ({file_path}): {e}")
+            gagal += 1
+    return ok, gagal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bangun indeks teks penuh submission.")
+    parser.add_argument("--semua", action="store_true", help="Indeks ulang semua submission")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    ok, gagal = rebuild(args.semua)
+    print(f"{ok} dokumen diindeks, {gagal} gagal ({time.perf_counter() - start:.1f} detik) -> {INDEX_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from ai_logic_v3 import _scan_pages, compute_raw_scores, score
+
+TEMPLATE = {
+    'id': None,
+    'required_keywords': 'analisis, laporan kinerja',
+    'required_sections': '',
+    'tipe_dokumen': 'Deskriptif/Notulensi',
+    'weight_relevansi': 25, 'weight_struktur': 25, 'weight_analisis': 25, 'weight_keluasan': 25,
+}
+
+
+def _raw(text):
+    features, _ = _scan_pages([text], [])
+    return compute_raw_scores(features, TEMPLATE)
+
+
+def test_kata_kunci_cocok_lewat_kata_dasar():
+    raw = _raw("Tim menganalisis laporan kinerjanya setiap bulan.")
+    assert raw['found_keywords'] == 2
+
+
+def test_kata_kunci_multi_kata_harus_berdampingan():
+    raw = _raw("Analisis kinerja pegawai dimuat dalam laporan tahunan.")
+    assert raw['found_keywords'] == 1
+
+
+def test_insight_tidak_dihitung_dari_kata_yang_berjauhan_atau_kata_sambung():
+    raw = _raw("Hal ini dibahas lebih lanjut karena tindak pidana terjadi sebab kelalaian.")
+    assert raw['analisis'] == 0
+
+
+def test_insight_cocok_lewat_kata_dasar():
+    raw = _raw("Kami merekomendasikan agar hasilnya ditindaklanjuti dan dievaluasi.")
+    assert raw['analisis'] > 0
+
+
+def test_catatan_early_exit_tidak_melaporkan_jumlah_kata_parsial():
+    pages = ["data " * 600, "data " * 600]
+    features, chunks = _scan_pages(pages, [], stop_when=lambda f: f['word_count'] > 1000, keep_text=False)
+    assert features['partial'] and chunks is None
+    catatan = score(features, dict(TEMPLATE, required_keywords='data'))[1]
+    assert "(> 1000 kata)" in catatan
+
+
+def test_bobot_bagian_saja_tidak_mengubah_relevansi():
+    features, _ = _scan_pages(["Tim menganalisis laporan bulanan."], [])
+    plain = compute_raw_scores(features, TEMPLATE)
+    weighted = compute_raw_scores(features, dict(TEMPLATE, required_sections='pendahuluan:3, penutup'))
+    assert plain['found_keywords'] == 1
+    assert weighted['relevansi'] == plain['relevansi'] == 50
@@ -0,0 +1,27 @@
+import pytest
+import pdf_cache
+from doc_guard import DocumentTooLarge
+
+
+def _fake_pages(n, opened):
+    def iter_raw_pages(file_path):
+        for i in range(n):
+            opened.append(i)
+            yield f"Halaman {i}"
+    return iter_raw_pages
+
+
+def test_iter_page_texts_menolak_dokumen_melebihi_batas_halaman(monkeypatch):
+    opened = []
+    monkeypatch.setattr(pdf_cache, 'iter_raw_pages', _fake_pages(10, opened))
+    monkeypatch.setattr(pdf_cache, 'ANALYSIS_MAX_PAGES', 3)
+    with pytest.raises(DocumentTooLarge):
+        list(pdf_cache.iter_page_texts('dok.pdf'))
+    # Berhenti di halaman pertama yang melewati batas, sisanya tidak dibaca
+    assert opened == [0, 1, 2, 3]
+
+
+def test_iter_page_texts_di_bawah_batas(monkeypatch):
+    monkeypatch.setattr(pdf_cache, 'iter_raw_pages', _fake_pages(3, []))
+    monkeypatch.setattr(pdf_cache, 'ANALYSIS_MAX_PAGES', 3)
+    assert list(pdf_cache.iter_page_texts('dok.pdf')) == ['halaman 0 ', 'halaman 1 ', 'halaman 2 ']
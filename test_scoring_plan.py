@@ -0,0 +1,62 @@
+import pytest
+from scoring_plan import get_plan, has_weights, parse_criteria, validate_criteria
+
+TEMPLATE = {
+    'id': None,
+    'required_sections': '',
+    'tipe_dokumen': 'Deskriptif/Notulensi',
+    'weight_relevansi': 25, 'weight_struktur': 25, 'weight_analisis': 25, 'weight_keluasan': 25,
+}
+
+
+def test_parse_criteria_default_bobot_dan_batas():
+    assert parse_criteria('Laporan, analisis') == [('laporan', 1.0, 1), ('analisis', 1.0, 1)]
+
+
+def test_parse_criteria_bobot_dan_batas():
+    assert parse_criteria('anggaran:3:5, penutup:2, rasio:0.5') == [
+        ('anggaran', 3.0, 5), ('penutup', 2.0, 1), ('rasio', 0.5, 1),
+    ]
+
+
+@pytest.mark.parametrize('value', ['jam 08:00', 'rapat pukul 13:30:00', 'catatan: lihat lampiran',
+                                   'anggaran:0', 'anggaran:x', 'anggaran:1:0', 'a:1:2:3', ':3'])
+def test_parse_criteria_istilah_lain_dengan_titik_dua_dipakai_utuh(value):
+    assert parse_criteria(value) == [(value, 1.0, 1)]
+
+
+def test_parse_criteria_kosong():
+    assert parse_criteria(None) == []
+    assert parse_criteria(' , ') == []
+
+
+def test_has_weights():
+    assert has_weights('laporan, anggaran:2')
+    assert not has_weights('jam 08:00, laporan')
+    assert not has_weights('')
+
+
+@pytest.mark.parametrize('value', ['anggaran:x', 'anggaran:0', 'anggaran:2:0', 'anggaran:1.5:2.5'])
+def test_validate_criteria_menolak_kriteria_tidak_valid(value):
+    with pytest.raises(ValueError):
+        validate_criteria(value)
+
+
+@pytest.mark.parametrize('value', ['laporan, anggaran:3:5', 'jam 08:00', ''])
+def test_validate_criteria_menerima(value):
+    validate_criteria(value)
+
+
+def test_template_lama_dengan_titik_dua_tetap_terkompilasi():
+    plan = get_plan(dict(TEMPLATE, required_keywords='jam 08:00, laporan'))
+    assert plan.keywords == ('jam 08:00', 'laporan')
+    assert not plan.keywords_weighted
+
+
+def test_plan_berbobot():
+    plan = get_plan(dict(TEMPLATE, required_keywords='anggaran:3:5, laporan'))
+    assert plan.keywords == ('anggaran', 'laporan')
+    assert plan.keyword_weights == (3.0, 1.0)
+    assert plan.keyword_caps == (5, 1)
+    assert plan.keywords_weighted
+    assert not plan.sections_weighted
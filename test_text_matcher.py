@@ -0,0 +1,38 @@
+from text_matcher import TermMatcher
+
+QUANT = ('angka', 'persen', 'rupiah')
+
+
+def _scan(terms, text, quant_from=0):
+    matcher = TermMatcher(terms)
+    hits = {t: -1 for t in matcher.terms}
+    quant = {kind: 0 for kind in QUANT}
+    matcher.scan(text, hits, quant, quant_from=quant_from)
+    return hits, quant
+
+
+def test_istilah_yang_dimulai_di_dalam_angka_tetap_ditemukan():
+    hits, quant = _scan(('2024 kesimpulan',), '12024 kesimpulan')
+    assert hits['2024 kesimpulan'] == 1
+    assert quant['angka'] == 1
+
+
+def test_istilah_dan_angka_di_posisi_yang_sama_sama_sama_terhitung():
+    hits, quant = _scan(('2024',), 'tahun 2024')
+    assert hits['2024'] == 6
+    assert quant['angka'] == 1
+
+
+def test_istilah_tumpang_tindih():
+    hits, _ = _scan(('hasil', 'hasil analisis', 'analisis'), 'hasil analisis data')
+    assert hits == {'hasil': 0, 'hasil analisis': 0, 'analisis': 6}
+
+
+def test_pola_kuantitatif():
+    _, quant = _scan(('data',), 'naik 50% menjadi rp 5000 dari 12 unit')
+    assert quant == {'angka': 3, 'persen': 1, 'rupiah': 1}
+
+
+def test_kuantitatif_sebelum_quant_from_diabaikan():
+    _, quant = _scan((), '10 dan 20', quant_from=3)
+    assert quant['angka'] == 1
@@ -0,0 +1,92 @@
+from collections import Counter
+import pytest
+from tokenizer import count_stem_bigrams, normalize_token, stem, stem_counts, stem_phrase, tokenize
+
+
+def test_normalize_token():
+    assert normalize_token('Laporan,') == 'laporan'
+    assert normalize_token('ｌａｐｏｒａｎ') == 'laporan'
+    assert normalize_token('...') == ''
+
+
+def test_tokenize():
+    assert tokenize('Data-data, (laporan) 2025!') == ['data-data', 'laporan', '2025']
+
+
+@pytest.mark.parametrize('word, expected', [
+    ('menganalisis', 'analisis'),
+    ('laporan', 'lapor'),
+    ('melaporkan', 'lapor'),
+    ('pelaporan', 'lapor'),
+    ('laporannya', 'lapor'),
+    ('kesimpulan', 'simpul'),
+    ('menyimpulkan', 'simpul'),
+    ('merekomendasikan', 'rekomendasi'),
+    ('mengevaluasi', 'evaluasi'),
+    ('didiskusikan', 'diskusi'),
+    ('dikerjakan', 'kerja'),
+    ('pekerjaan', 'kerja'),
+    ('penulisan', 'tulis'),
+    ('penyusunan', 'susun'),
+    ('perbaikan', 'baik'),
+    ('memperbaiki', 'baik'),
+    ('kebijakan', 'bijak'),
+    ('pembelajaran', 'ajar'),
+    ('data-data', 'data'),
+])
+def test_stem_imbuhan(word, expected):
+    assert stem(word) == expected
+
+
+@pytest.mark.parametrize('word', [
+    'makan', 'jalan', 'ketua', 'terima', 'perintah', 'rekomendasi', 'evaluasi', 'diskusi', 'sebab',
+])
+def test_stem_kata_dasar_tidak_dipotong(word):
+    assert stem(word) == word
+
+
+@pytest.mark.parametrize('family', [
+    'nilai menilai penilaian dinilai',
+    'pegawai kepegawaian',
+    'capai mencapai capaian pencapaian tercapai',
+    'kelola mengelola pengelolaan dikelola',
+    'rencana perencanaan merencanakan',
+    'didik mendidik pendidikan',
+    'atur mengatur peraturan',
+])
+def test_stem_satu_keluarga_kata_satu_stem(family):
+    words = family.split()
+    assert {stem(w) for w in words} == {words[0]}
+
+
+def test_stem_peluluhan_tanpa_kamus_tetap_dipotong():
+    assert stem('menilik') == 'tilik'
+    assert stem('peranan') == 'peran'
+
+
+def test_stem_tanpa_partikel_tah():
+    assert stem('pemerintah') == 'perintah'
+
+
+def test_stem_phrase():
+    assert stem_phrase('Tindak Lanjut') == ('tindak', 'lanjut')
+
+
+def test_stem_counts():
+    counts = stem_counts(Counter({'laporan': 2, 'melaporkan': 1, 'Laporannya,': 1}))
+    assert counts['lapor'] == 4
+
+
+def test_count_stem_bigrams_berdampingan_dan_lintas_halaman():
+    bigrams = Counter()
+    token_stems = {}
+    last = count_stem_bigrams('perlu ditindak'.split(), bigrams, token_stems)
+    count_stem_bigrams('lanjut segera'.split(), bigrams, token_stems, last)
+    assert bigrams['tindak lanjut'] == 1
+    assert bigrams['perlu tindak'] == 1
+
+
+def test_count_stem_bigrams_tidak_cocok_jika_berjauhan():
+    bigrams = Counter()
+    count_stem_bigrams('lebih lanjut dari tindak pidana'.split(), bigrams, {})
+    assert bigrams['tindak lanjut'] == 0
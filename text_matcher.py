@@ -0,0 +1,95 @@
+import re
+from functools import lru_cache
+
+# Pola kuantitatif yang ikut dicari dalam scan yang sama:
+# mata uang (cth: Rp 5000), angka (cth: 123) dan persentase (cth: 50%).
+# Semuanya lookahead (lebar nol) agar tidak 'memakan' teks: istilah yang
+# dimulai di tengah/di awal angka ('2024 kesimpulan') tetap ditemukan.
+_QUANT_START = r'rp\s*\d|(?<!\d)\d'
+_QUANT_REGEX = (r'(?:(?=(?P<rupiah>rp\s*(?=\d))))?'
+                r'(?:(?<!\d)(?=(?P<angka>\d+)(?P<persen>%)?))?')
+
+
+def _trie_regex(terms):
+    """
+    Menggabungkan istilah literal menjadi satu regex berbentuk trie
+    (cth: 'hasil', 'hasil analisis' -> 'hasil(?:\\ analisis)?'), sehingga
+    regex engine tidak perlu mencoba setiap istilah satu per satu.
+    Opsi yang lebih panjang selalu dicoba lebih dulu.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        ends_here = '' in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            body = (body if len(branches) > 1 else '(?:' + body + ')') + '?'
+        return body
+
+    return build(trie)
+
+
+class TermMatcher:
+    """
+    Pencocok multi-pola yang dikompilasi sekali: semua istilah literal
+    (bagian, insight, dll.) dan pola kuantitatif ditemukan dalam SATU kali
+    scan teks. Istilah dari input user selalu di-escape, tidak pernah
+    diperlakukan sebagai regex.
+    """
+    __slots__ = ('terms', '_regex', '_prefixes')
+
+    def __init__(self, terms):
+        self.terms = tuple(dict.fromkeys(t for t in terms if t))
+        # Satu match per posisi awal istilah/pola kuantitatif; semua grup
+        # lookahead opsional, jadi istilah dan angka yang dimulai di posisi
+        # yang sama sama-sama terbaca
+        starts = [_QUANT_START]
+        term_group = ''
+        if self.terms:
+            trie = _trie_regex(self.terms)
+            starts.insert(0, trie)
+            # Lookahead agar istilah yang saling tumpang-tindih tetap terdeteksi
+            term_group = f'(?:(?=(?P<term>{trie})))?'
+        self._regex = re.compile(f"(?=(?:{'|'.join(starts)})){term_group}{_QUANT_REGEX}")
+        # Di satu posisi regex melaporkan istilah terpanjang; istilah lain yang
+        # merupakan awalan (prefix) darinya pasti juga muncul di posisi itu.
+        self._prefixes = {
+            term: [t for t in self.terms if term.startswith(t)]
+            for term in self.terms
+        }
+
+    def scan(self, text, hits, quant, base=0, quant_from=0):
+        """
+        Scan 'text' satu kali.
+        - hits: dict {istilah: offset pertama}, hanya diisi jika belum ditemukan (-1)
+        - quant: dict {'angka', 'persen', 'rupiah'} yang ditambah jumlah temuannya;
+          temuan yang berakhir sebelum 'quant_from' diabaikan (sudah dihitung)
+        - base: offset 'text' terhadap awal dokumen
+        """
+        for m in self._regex.finditer(text):
+            term = m.group('term') if self.terms else None
+            if term is not None:
+                pos = base + m.start()
+                for t in self._prefixes[term]:
+                    if hits.get(t, -1) < 0:
+                        hits[t] = pos
+            if m.group('rupiah') is not None and m.end('rupiah') > quant_from:
+                quant['rupiah'] += 1
+            if m.group('angka') is not None and m.end('persen' if m.group('persen') else 'angka') > quant_from:
+                quant['angka'] += 1
+                if m.group('persen'):
+                    quant['persen'] += 1
+
+
+@lru_cache(maxsize=256)
+def get_matcher(terms):
+    """TermMatcher untuk tuple istilah tertentu (dikompilasi sekali, lalu di-cache)."""
+    return TermMatcher(terms)
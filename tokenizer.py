@@ -0,0 +1,245 @@
+"""
+Tokenisasi, normalisasi dan stemming bahasa Indonesia untuk penilaian V3.
+
+- normalize_token(): NFKC + lowercase + buang tanda baca di tepi
+  ('Laporan,' -> 'laporan', 'ｌａｐｏｒａｎ' -> 'laporan')
+- tokenize(): daftar kata dari teks bebas
+- stem(): stemmer imbuhan rule-based (gaya Tala, dengan daftar kecil kata dasar) yang
+  di-memoize dengan LRU, jadi setiap kata unik hanya di-stem sekali per proses
+  ('menganalisis' -> 'analisis', 'laporannya' -> 'lapor')
+- stem_counts(): Counter frekuensi stem dari Counter token dokumen
+- count_stem_bigrams(): frekuensi pasangan stem berurutan, untuk istilah
+  multi-kata ('tindak lanjut' harus berdampingan, bukan sekadar ada)
+
+Peluluhan awalan sebelum vokal ambigu (me-nilai vs me-(t)ulis, pe-rencana vs
+per-ubah), jadi stemmer mencoba semua kemungkinan dan memilih kata dasar yang
+ada di daftar kecil _KNOWN_ROOTS (kosakata umum laporan kinerja). Kata di luar
+daftar memakai kemungkinan pertama, sehingga satu keluarga kata bisa saja
+tidak berakhir di stem yang sama; tambahkan kata dasarnya ke _KNOWN_ROOTS.
+"""
+import re
+import string
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+STEM_CACHE_SIZE = 65536
+
+_PUNCTUATION = string.punctuation + "“”‘’«»…–—•"
+_WORD_RE = re.compile(r"[^\W_]+(?:-[^\W_]+)*")
+_VOWELS = frozenset("aiueo")
+
+_PARTICLES = ('lah', 'kah', 'pun')
+_POSSESSIVES = ('nya', 'ku', 'mu')
+_SUFFIXES = ('kan', 'an', 'i')
+# Stem minimal harus punya 2 vokal (kira-kira 2 suku kata) dan 4 huruf, agar
+# kata dasar pendek seperti 'makan', 'ketua' atau 'terima' tidak terpotong
+_MIN_VOWELS = 2
+_MIN_LENGTH = 4
+# Gugus konsonan di awal kata dasar yang wajar (selain itu, pemotongan
+# awalan dianggap salah: 'diskusi' bukan di- + 'skusi')
+_ONSET_DIGRAPHS = ('kh', 'ny', 'ng', 'sy')
+# Pasangan awalan-akhiran yang tidak ada dalam bahasa Indonesia (aturan
+# konfiks Tala): 'kebijakan' = ke-bijak-an, bukan ke-bija-kan
+_DISALLOWED_SUFFIXES = {
+    'ke': ('kan', 'i'),
+    'ber': ('i',),
+    'di': ('an',),
+    'me': ('an',),
+    'ter': ('an',),
+}
+
+# Kata dasar yang dikenal, untuk memilih di antara kemungkinan pemotongan
+# yang ambigu ('menilai' -> 'nilai', bukan 'tilai'; 'kelola' tidak menjadi
+# ke- + 'lola')
+_KNOWN_ROOTS = frozenset('''
+    ajar ambil analisis anggar atur awas baik bangun bijak bina capai cipta
+    data didik evaluasi hasil hitung ikut kaji kelola kembang kenal kerja
+    kirim kumpul laksana lapor latih layan milik nilai olah pakai pantau
+    pegawai perintah periksa pimpin proses putus rekomendasi rencana sedia
+    simpul susun tanya tetap teliti terima tindak tingkat tugas tuju tulis
+    ubah ukur usaha usul
+'''.split())
+
+
+def normalize_token(token):
+    """Token bersih: NFKC, lowercase, tanpa tanda baca di awal/akhir ('' jika habis)."""
+    return unicodedata.normalize('NFKC', token).lower().strip(_PUNCTUATION)
+
+
+def tokenize(text):
+    """Kata-kata di 'text' (NFKC + lowercase); tanda baca dibuang, tanda hubung dipertahankan."""
+    return _WORD_RE.findall(unicodedata.normalize('NFKC', text).lower())
+
+
+def _vowels(word):
+    return sum(1 for ch in word if ch in _VOWELS)
+
+
+def _suffix_variants(word, suffixes, min_length=0):
+    """Kemungkinan hasil pemotongan satu akhiran (urut prioritas), diakhiri 'word' sendiri."""
+    for suffix in suffixes:
+        # Kata serapan berakhiran -si (evaluasi, diskusi) dan kata dasar
+        # berakhiran vokal + i (nilai, capai, pegawai) bukan kata dasar + -i
+        if suffix == 'i' and (word.endswith('si') or word[-2:-1] in _VOWELS):
+            continue
+        rest = word[:-len(suffix)]
+        if word.endswith(suffix) and _vowels(rest) >= _MIN_VOWELS and len(rest) >= min_length:
+            yield rest
+    yield word
+
+
+def _strip_suffix(word, suffixes, min_length=0):
+    return next(_suffix_variants(word, suffixes, min_length))
+
+
+def _prefix_variants(word):
+    """
+    Kemungkinan pemotongan satu awalan: meN-/peN- (dengan peluluhan:
+    menulis -> tulis, menyusun -> susun), di-, ter-, ke-, ber-/per-/bel-/
+    pel-/be-/pe-. List (sisa kata, jenis awalan), urut prioritas; kosong
+    jika tidak ada awalan. Peluluhan sebelum vokal ambigu (menilai = me-nilai,
+    menulis = me-tulis), jadi semua bentuk dicoba.
+    """
+    if word.startswith('memper'):
+        return [(word[3:], 'me')]
+    for prefix, kind in (('meng', 'me'), ('peng', 'pe')):
+        if word.startswith(prefix) and len(word) > 4:
+            if word[4] in _VOWELS:
+                return [(word[4:], kind), ('k' + word[4:], kind)]
+            if word[4] in 'ghk':
+                return [(word[4:], kind)]
+    for prefix, kind in (('meny', 'me'), ('peny', 'pe')):
+        if word.startswith(prefix) and len(word) > 4 and word[4] in _VOWELS:
+            return [('s' + word[4:], kind)]
+    for prefix, kind in (('men', 'me'), ('pen', 'pe')):
+        if word.startswith(prefix) and len(word) > 3:
+            if word[3] in 'cdjz':
+                return [(word[3:], kind)]
+            if word[3] in _VOWELS:
+                return [('t' + word[3:], kind), (word[2:], kind)]
+    for prefix, kind in (('mem', 'me'), ('pem', 'pe')):
+        if word.startswith(prefix) and len(word) > 3:
+            if word[3] in 'bfv':
+                return [(word[3:], kind)]
+            if word[3] in _VOWELS:
+                return [('p' + word[3:], kind), (word[2:], kind)]
+    if word.startswith('me') and len(word) > 2 and word[2] in 'lrwy':
+        return [(word[2:], 'me')]
+    for prefix in ('di', 'ke'):
+        if word.startswith(prefix):
+            return [(word[2:], prefix)]
+    for prefix in ('ter', 'ber', 'per'):
+        if word.startswith(prefix):
+            rest = word[3:]
+            if not rest or rest[0] not in _VOWELS:
+                return [(rest, prefix)]
+            # ter-/ber-/per- + vokal sering bagian dari kata dasar
+            # ('terima', 'perintah', 'beras'): hanya dipotong jika sisanya panjang
+            if _vowels(rest) <= _MIN_VOWELS:
+                return []
+            if prefix == 'per':
+                # pe- + kata dasar ber-r dicoba lebih dulu (perencanaan = pe-rencana-an)
+                return [(word[2:], 'pe'), (rest, prefix)]
+            return [(rest, prefix)]
+    if word.startswith(('belajar', 'pelajar')):
+        return [(word[3:], word[:2])]
+    if word.startswith(('be', 'pe')) and len(word) > 4 and word[2] not in _VOWELS and word[3:5] == 'er':
+        return [(word[2:], 'ber' if word[0] == 'b' else 'pe')]
+    if word.startswith('pe') and len(word) > 2 and word[2] in 'lrwy':
+        return [(word[2:], 'pe')]
+    return []
+
+
+def _accept(candidate, word):
+    """Hasil pemotongan dipakai hanya jika masih cukup panjang dan awalnya wajar."""
+    if candidate == word or _vowels(candidate) < _MIN_VOWELS or len(candidate) < _MIN_LENGTH:
+        return False
+    if (candidate[0] not in _VOWELS and candidate[1] not in _VOWELS
+            and not candidate.startswith(_ONSET_DIGRAPHS)):
+        return False
+    return True
+
+
+def _candidates(word, depth=0, first_prefix=None):
+    """
+    Semua kemungkinan stem dari 'word' (sesudah partikel/kata ganti milik),
+    urut prioritas: pemotongan awalan terdalam dulu, baru 'word' sendiri.
+    di-/ke- hanya boleh menjadi awalan terluar ('pendidikan' bukan
+    pen-di-dik-an).
+    """
+    if depth < 3:
+        for rest, kind in _prefix_variants(word):
+            if depth and kind in ('di', 'ke'):
+                continue
+            if _accept(rest, word):
+                yield from _candidates(rest, depth + 1, first_prefix or kind)
+    disallowed = _DISALLOWED_SUFFIXES.get(first_prefix, ())
+    yield from _suffix_variants(word, [s for s in _SUFFIXES if s not in disallowed], _MIN_LENGTH)
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    """
+    Bentuk dasar (perkiraan) kata Indonesia yang sudah dinormalisasi.
+    Urutan: partikel -> kata ganti milik -> awalan (maks. 3 lapis, cth:
+    mem-per-baiki) -> akhiran (kecuali pasangan konfiks yang tidak mungkin).
+    Dari semua kemungkinan pemotongan, kata dasar yang dikenal
+    (_KNOWN_ROOTS) dipilih lebih dulu; selain itu kemungkinan pertama.
+    Kata ulang ('data-data') menjadi satu kata.
+    """
+    if '-' in word:
+        parts = word.split('-')
+        if all(p == parts[0] for p in parts):
+            return stem(parts[0])
+        return word
+    if not word.isalpha() or _vowels(word) <= _MIN_VOWELS:
+        return word
+
+    base = _strip_suffix(word, _PARTICLES)
+    first = None
+    for form in dict.fromkeys((_strip_suffix(base, _POSSESSIVES), base)):
+        for candidate in _candidates(form):
+            if candidate in _KNOWN_ROOTS:
+                return candidate
+            first = first or candidate
+    return first
+
+
+def stem_phrase(phrase):
+    """Tuple stem setiap kata di 'phrase' (kata kunci template bisa multi-kata)."""
+    return tuple(stem(t) for t in tokenize(phrase))
+
+
+def stem_counts(token_counts):
+    """
+    Counter frekuensi stem dari Counter token (hasil split spasi). Cukup
+    memproses token unik, jadi dihitung sekali per dokumen dengan biaya kecil.
+    """
+    counts = Counter()
+    for token, n in token_counts.items():
+        for word in tokenize(token):
+            counts[stem(word)] += n
+    return counts
+
+
+def bigram_key(first, second):
+    """Kunci pasangan stem di Counter bigram (string, agar bisa disimpan ke JSON)."""
+    return f"{first} {second}"
+
+
+def count_stem_bigrams(words, bigrams, token_stems, previous=None):
+    """
+    Menambah frekuensi pasangan stem berurutan dari 'words' (token hasil
+    split spasi) ke Counter 'bigrams'. 'token_stems' adalah cache token ->
+    stem per dokumen; 'previous' = stem terakhir halaman sebelumnya.
+    Return stem terakhir (untuk halaman berikutnya).
+    """
+    sequence = [] if previous is None else [previous]
+    for token in words:
+        stems = token_stems.get(token)
+        if stems is None:
+            stems = token_stems[token] = tuple(stem(w) for w in tokenize(token))
+        sequence.extend(stems)
+    bigrams.update(bigram_key(a, b) for a, b in zip(sequence, sequence[1:]))
+    return sequence[-1] if sequence else previous
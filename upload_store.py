@@ -0,0 +1,70 @@
+import hashlib
+import os
+import tempfile
+
+# --- Penyimpanan Upload (content-addressed) ---
+# File upload disalin per-chunk ke disk (tidak pernah utuh di memori),
+# dibatasi ukurannya, lalu disimpan dengan nama = SHA-256 isinya:
+#
+#     uploads/ab/cd/abcd1234....pdf
+#
+# File yang identik hanya disimpan sekali, dan submit ulang di hari yang
+# sama tidak lagi saling menimpa.
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_MB", "20")) * 1024 * 1024
+
+_CHUNK_SIZE = 1024 * 1024
+_PDF_MAGIC = b"%PDF-"
+
+
+class UploadError(ValueError):
+    """Upload ditolak (terlalu besar / bukan PDF). Pesan aman ditampilkan ke user."""
+
+
+def upload_path(digest):
+    """Lokasi file untuk SHA-256 'digest' (fan-out 2 level)."""
+    return os.path.join(UPLOAD_DIR, digest[:2], digest[2:4], f"{digest}.pdf")
+
+
+def store_upload(fileobj, max_bytes=None):
+    """
+    Menyimpan file upload (objek file-like, mis. UploadedFile Streamlit)
+    secara streaming. Return (sha256, file_path, sudah_ada).
+    Raise UploadError jika melebihi batas ukuran atau bukan PDF.
+    """
+    max_bytes = UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    tmp_dir = os.path.join(UPLOAD_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    if hasattr(fileobj, 'seek'):
+        fileobj.seek(0)
+
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: fileobj.read(_CHUNK_SIZE), b""):
+                if size == 0 and not chunk.startswith(_PDF_MAGIC):
+                    raise UploadError("File bukan dokumen PDF yang valid.")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"Ukuran file melebihi batas {max_bytes // (1024 * 1024)} MB.")
+                h.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise UploadError("File kosong.")
+
+        digest = h.hexdigest()
+        path = upload_path(digest)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return digest, path, True
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return digest, path, False
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise